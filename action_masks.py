@@ -0,0 +1,52 @@
+"""Legal move and fire targets of units as bitmasks.
+
+Targets are offsets from the unit position within the action range ``r``
+(``MOVE_RANGE`` or ``FIRE_RANGE``), bit ``(dy + r) * (2r + 1) + (dx + r)`` of the
+mask is set when the target is legal, i.e. when ``Move``/``Fire`` validation
+would accept it. ``MOVE_OFFSETS``/``FIRE_OFFSETS`` list the offsets in bit order.
+
+Legality depends only on the position and the map size, so a mask is the AND
+of precomputed column and row masks.
+"""
+from actions import MOVE_RANGE, FIRE_RANGE
+
+
+def range_offsets(reach):
+    return [(dx, dy) for dy in range(-reach, reach + 1) for dx in range(-reach, reach + 1)]
+
+
+MOVE_OFFSETS = range_offsets(MOVE_RANGE)
+FIRE_OFFSETS = range_offsets(FIRE_RANGE)
+
+
+def axis_masks(size, reach, axis):
+    # masks of the offsets keeping the coordinate inside [0, size) for every coordinate
+    masks = []
+    for coord in range(size):
+        mask = 0
+        for bit, offset in enumerate(range_offsets(reach)):
+            if 0 <= coord + offset[axis] < size:
+                mask |= 1 << bit
+        masks.append(mask)
+
+    return masks
+
+
+def decode_mask(mask, position, offsets):
+    # legal target cells of the mask
+    x, y = position
+    return [(x + dx, y + dy) for bit, (dx, dy) in enumerate(offsets) if mask >> bit & 1]
+
+
+class ActionMasks:
+    __slots__ = ('move_columns', 'move_rows', 'fire_columns', 'fire_rows')
+
+    def __init__(self, width, height):
+        self.move_columns = axis_masks(width, MOVE_RANGE, 0)
+        self.move_rows = axis_masks(height, MOVE_RANGE, 1)
+        self.fire_columns = axis_masks(width, FIRE_RANGE, 0)
+        self.fire_rows = axis_masks(height, FIRE_RANGE, 1)
+
+    def unit_masks(self, position):
+        x, y = position
+        return self.move_columns[x] & self.move_rows[y], self.fire_columns[x] & self.fire_rows[y]
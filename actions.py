@@ -4,6 +4,11 @@ from utils import is_coordinate, inside_rectangle
 
 # TODO rename fire to shot
 
+# maximal distance along each axis
+MOVE_RANGE = 1
+FIRE_RANGE = 2
+
+
 class Action:
     def __init__(self, unit_id, game):
         if not isinstance(unit_id, int):
@@ -47,7 +52,7 @@ class Move(Action):
             raise InvalidAction('Move outside the map')
 
         unit_x, unit_y = self.unit.position
-        if abs(target_x - unit_x) > 1 or abs(target_y - unit_y) > 1:
+        if abs(target_x - unit_x) > MOVE_RANGE or abs(target_y - unit_y) > MOVE_RANGE:
             raise InvalidAction('Out of range move')
 
     def render(self):
@@ -61,15 +66,14 @@ class Move(Action):
         }
 
 
-# TODO resolve super conflict of __init__ and validate of move and teleport
 class Teleport(Move):
+    # moves the unit back to its spawn
     def __init__(self, unit_id, game):
-        super(Action, self).__init__(unit_id, game)
-        self.target = self.unit.position
+        Action.__init__(self, unit_id, game)
+        self.target = self.unit.spawn
 
     def validate(self):
-        if not is_coordinate(self.target):
-            raise InvalidAction('Move target must be coordinate (tuple of two integers)')
+        pass
 
     def render(self):
         return {
@@ -97,7 +101,7 @@ class Fire(Action):
             raise InvalidAction('Fire outside the map')
 
         unit_x, unit_y = self.unit.position
-        if abs(target_x - unit_x) > 2 or abs(target_y - unit_y) > 2:
+        if abs(target_x - unit_x) > FIRE_RANGE or abs(target_y - unit_y) > FIRE_RANGE:
             raise InvalidAction('Out of range fire')
 
     def render(self):
@@ -0,0 +1,213 @@
+"""Load test of the TCP server with a swarm of synthetic bots.
+
+    python benchmarks/load_test.py --bots 1000 --units 2 --think-time 0.01
+
+Every bot is a lightweight asyncio connection playing one team of a
+synthetic map: it reads the map config, then for every state waits the think
+time and sends random moves of its units, optionally padded to a payload
+size. A share of the bots can be slow readers that delay reading every state.
+
+By default the single match ``runner.Server`` is started in this process and
+the report includes server tick durations and failed clients. With
+``--host``/``--port`` an already running server is loaded instead (it must
+play a map with ``--bots`` teams of ``--units`` units, see ``--write-map``), and
+tick latency is then measured as the interval between states seen by the bots.
+Memory is of this process, so in-process runs include the bots' parsed states.
+There is no multi-match server in this tree yet to run against.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game
+from runner import Server
+from utils import percentiles
+
+
+# states of big maps are much longer than the default line limit of asyncio streams
+STATE_LIMIT = 1 << 26
+
+
+def make_map(teams, units_per_team):
+    # units of all teams on a square grid with a free cell between them
+    side = 1
+    while side * side < teams * units_per_team:
+        side += 1
+
+    map_config = {'map_width': 2 * side, 'map_height': 2 * side, 'teams': []}
+    for team in range(teams):
+        units = []
+        for unit in range(units_per_team):
+            unit_id = team * units_per_team + unit
+            units.append({'id': unit_id, 'spawn_x': 2 * (unit_id % side), 'spawn_y': 2 * (unit_id // side)})
+        map_config['teams'].append(units)
+
+    return map_config
+
+
+def rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+class BotStats:
+    def __init__(self):
+        self.states = 0
+        self.bytes_received = 0
+        self.state_intervals = []
+        self.disconnects = 0
+        self.finished = 0
+
+
+async def bot(host, port, think_time, padding, slow_delay, stats):
+    try:
+        reader, writer = await asyncio.open_connection(host, port, limit=STATE_LIMIT)
+    except OSError:
+        stats.disconnects += 1
+        return
+
+    try:
+        config = json.loads(await reader.readline())
+        width, height, team = config['map_width'], config['map_height'], config['my_team_id']
+        my_units = [unit['id'] for unit in config['units'] if unit['team'] == team]
+
+        last_state = None
+        while True:
+            if slow_delay:
+                await asyncio.sleep(slow_delay)
+
+            line = await reader.readline()
+            if not line:
+                stats.finished += 1
+                break
+
+            now = time.perf_counter()
+            if last_state is not None:
+                stats.state_intervals.append(now - last_state)
+            last_state = now
+            stats.states += 1
+            stats.bytes_received += len(line)
+
+            state = json.loads(line)
+            positions = {unit['id']: (unit['x'], unit['y']) for unit in state['units']}
+
+            if think_time:
+                await asyncio.sleep(random.uniform(0, 2 * think_time))
+
+            command = []
+            for unit_id in my_units:
+                if unit_id in positions:
+                    x, y = positions[unit_id]
+                    x = min(width - 1, max(0, x + random.randint(-1, 1)))
+                    y = min(height - 1, max(0, y + random.randint(-1, 1)))
+                    command.append({'action': 'move', 'properties': {'unit_id': unit_id, 'x': x, 'y': y}})
+            if padding:
+                command.append({'action': 'padding', 'properties': {'data': 'x' * padding}})
+
+            writer.write((json.dumps(command) + '\n').encode())
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        stats.disconnects += 1
+    finally:
+        writer.close()
+
+
+async def load_test(args):
+    stats = BotStats()
+    server = None
+    server_task = None
+    host, port = args.host, args.port
+
+    if host is None:
+        host = '127.0.0.1'
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            port = sock.getsockname()[1]
+
+        game = Game.from_map_config(make_map(args.bots, args.units), max_ticks=args.ticks, stalemate_ticks=None)
+        server = Server(game, host, port, tick_timeout=args.tick_timeout, log_path=None)
+        server_task = asyncio.create_task(server.run())
+        await asyncio.sleep(0.1)
+
+    rss_start = rss()
+    rss_peak = rss_start
+    started = time.perf_counter()
+
+    slow_bots = int(args.bots * args.slow_readers)
+    bots = [
+        asyncio.create_task(bot(host, port, args.think_time, args.padding,
+                                args.slow_delay if i < slow_bots else 0, stats))
+        for i in range(args.bots)
+    ]
+
+    pending = set(bots)
+    while pending:
+        _, pending = await asyncio.wait(pending, timeout=0.5)
+        rss_peak = max(rss_peak, rss())
+
+    elapsed = time.perf_counter() - started
+    if server_task is not None:
+        server.server.close()
+        await server_task
+
+    report = {
+        'bots': args.bots,
+        'elapsed': elapsed,
+        'states_received': stats.states,
+        'throughput': {
+            'states_per_second': stats.states / elapsed,
+            'bytes_per_second': stats.bytes_received / elapsed,
+        },
+        'bot_disconnects': stats.disconnects,
+        'memory': {'rss_start': rss_start, 'rss_peak': rss_peak, 'rss_growth': rss_peak - rss_start},
+        'state_interval': {f'p{point}': value for point, value in percentiles(stats.state_intervals).items()},
+    }
+
+    if server is not None and server.game_loop is not None:
+        summary = server.game_loop.summary()
+        report['ticks'] = summary['ticks']
+        report['ticks_per_second'] = summary['ticks'] / elapsed
+        report['tick_duration'] = summary['tick_duration']
+        report['server_failed_clients'] = len(summary['failed_clients'])
+        report['skipped_frames'] = sum(client['skipped_frames'] for client in summary['clients'].values())
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bots', type=int, default=100, help='Connections, each plays one team')
+    parser.add_argument('--units', type=int, default=1, help='Units per team, defines the state size')
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean seconds a bot thinks every tick')
+    parser.add_argument('--padding', type=int, default=0, help='Extra bytes in every command')
+    parser.add_argument('--slow-readers', type=float, default=0.0, help='Share of bots reading states late')
+    parser.add_argument('--slow-delay', type=float, default=0.05, help='Seconds slow readers wait before reading')
+    parser.add_argument('--tick-timeout', type=float, default=2.0)
+    parser.add_argument('--host', type=str, help='Host of a running server instead of the in-process one')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--write-map', type=str, help='Save the synthetic map for an external server and exit')
+    args = parser.parse_args()
+
+    if args.write_map is not None:
+        with open(args.write_map, 'w') as f:
+            json.dump(make_map(args.bots, args.units), f)
+        return
+
+    # every bot needs a descriptor on both ends of the connection
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    print(json.dumps(asyncio.run(load_test(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Game construction from a map config versus from a compiled map.
+
+    python benchmarks/map_setup.py --teams 2 --units 500 --games 200
+
+Both paths build the same synthetic map of ``load_test.make_map`` and the
+map config message of the first team; the compiled map is read from the cache.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game
+from map_cache import MapCache
+from load_test import make_map
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--teams', type=int, default=2)
+    parser.add_argument('--units', type=int, default=500, help='Units per team')
+    parser.add_argument('--games', type=int, default=200)
+    args = parser.parse_args()
+
+    map_config = make_map(args.teams, args.units)
+
+    started = time.perf_counter()
+    for _ in range(args.games):
+        Game.from_map_config(map_config).render_map_config(0)
+    from_config = (time.perf_counter() - started) / args.games
+
+    with tempfile.TemporaryDirectory() as directory:
+        MapCache(directory).get(map_config)
+        compiled_map = MapCache(directory).get(map_config)
+
+        started = time.perf_counter()
+        for _ in range(args.games):
+            compiled_map.new_game().render_map_config(0)
+        from_compiled = (time.perf_counter() - started) / args.games
+
+    print(f'units: {args.teams * args.units}, games: {args.games}')
+    print(f'from map config: {from_config * 1e6:.1f} us/game')
+    print(f'from compiled map: {from_compiled * 1e6:.1f} us/game ({from_config / from_compiled:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
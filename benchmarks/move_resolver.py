@@ -0,0 +1,79 @@
+"""Stress benchmark of the move resolver on dense formations.
+
+    python benchmarks/move_resolver.py --side 100 --ticks 20
+
+A side x side block of units marches one cell right every tick, so every row is
+a chain as long as the block. A second block of the same size rotates in 2x2
+cycles. Only move resolution is timed.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions import Move
+from game import Game
+
+
+def formation_game(side, ticks):
+    width = 2 * side + ticks + 2
+    height = side
+    units = []
+    unit_id = 0
+    # marching block on the left, rotating block on the right
+    for y in range(side):
+        for x in range(side):
+            units.append({'id': unit_id, 'spawn_x': x, 'spawn_y': y})
+            unit_id += 1
+    for y in range(side - side % 2):
+        for x in range(side - side % 2):
+            units.append({'id': unit_id, 'spawn_x': width - side + x, 'spawn_y': y})
+            unit_id += 1
+
+    return Game(width, height, [units], max_ticks=None, stalemate_ticks=None)
+
+
+def rotation_target(x, y, origin_x):
+    # clockwise inside 2x2 block: (0,0)->(1,0)->(1,1)->(0,1)->(0,0)
+    dx, dy = (x - origin_x) % 2, y % 2
+    next_offset = {(0, 0): (1, 0), (1, 0): (1, 1), (1, 1): (0, 1), (0, 1): (0, 0)}[dx, dy]
+    return x - dx + next_offset[0], y - dy + next_offset[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--side', type=int, default=100)
+    parser.add_argument('--ticks', type=int, default=20)
+    args = parser.parse_args()
+
+    game = formation_game(args.side, args.ticks)
+    origin_x = game.width - args.side
+
+    resolve_time = 0.0
+    moved = 0
+    for _ in range(args.ticks):
+        moves = []
+        for unit in game.units.values():
+            x, y = unit.position
+            if x < origin_x:
+                moves.append(Move(unit.id, x + 1, y, game))
+            else:
+                moves.append(Move(unit.id, *rotation_target(x, y, origin_x), game))
+
+        started = time.perf_counter()
+        _, non_conflict_moves = game.resolve_move_conflicts(moves)
+        resolve_time += time.perf_counter() - started
+
+        game.apply_moves(non_conflict_moves)
+        moved += len(non_conflict_moves)
+
+    units = len(game.units)
+    print(f'units: {units}, ticks: {args.ticks}, successful moves: {moved} of {units * args.ticks}')
+    print(f'resolve: {resolve_time / args.ticks * 1000:.2f} ms/tick, '
+          f'{resolve_time / (units * args.ticks) * 1e6:.3f} us/move')
+
+
+if __name__ == '__main__':
+    main()
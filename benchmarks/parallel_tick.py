@@ -0,0 +1,136 @@
+"""Tick time of the single process engine versus tiles in worker processes.
+
+    python benchmarks/parallel_tick.py --units 200000 --ticks 5 --workers 1 2 4 8
+
+One team of units on the grid of ``load_test.make_map`` with every unit moving
+to a random neighbour cell or firing at a random cell in range every tick, so
+there are move conflicts and chains across tile borders but no spawn kills.
+Every engine plays the same commands; the logs are compared at the end.
+
+Tiles are also run in this process with every tile timed: the master share
+is serial, and the slowest tile of every round bounds the tick with a core
+per tile, which gives the projected tick time without the cost of the pipes.
+With workers the CPU time of the master, pipes included, is its serial share.
+The garbage collector is paused during the ticks, otherwise its full
+collections of the growing log dominate and land at random tiles.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_cache import CompiledMap, compile_map
+from parallel import ParallelGame
+from load_test import make_map
+
+
+class TimedParallelGame(ParallelGame):
+    # tiles in this process, time of every tile and of the slowest tile of every round
+    def __init__(self, game, num_tiles):
+        super().__init__(game, num_tiles)
+        self.tile_time = 0.0
+        self.critical_time = 0.0
+
+    def call(self, command, data):
+        results = []
+        slowest = 0.0
+        for tile, tile_data in zip(self.tiles, data):
+            started = time.perf_counter()
+            results.append(getattr(tile, command)(tile_data))
+            elapsed = time.perf_counter() - started
+            self.tile_time += elapsed
+            slowest = max(slowest, elapsed)
+
+        self.critical_time += slowest
+        return results
+
+
+def random_commands(rng, game):
+    commands = []
+    for unit in game.units.values():
+        x, y = unit.position
+        if rng.random() < 0.8:
+            commands.append({'action': 'move', 'properties': {'unit_id': unit.id,
+                                                              'x': x + rng.randint(-1, 1), 'y': y + rng.randint(-1, 1)}})
+        else:
+            commands.append({'action': 'fire', 'properties': {'unit_id': unit.id,
+                                                              'x': x + rng.randint(-2, 2), 'y': y + rng.randint(-2, 2)}})
+    return {0: commands}
+
+
+def play(game, commands):
+    # wall time and CPU time of this process per tick
+    elapsed = 0.0
+    cpu_time = 0.0
+    gc.collect()
+    gc.disable()
+    try:
+        for tick_commands in commands:
+            started = time.perf_counter()
+            cpu_started = time.process_time()
+            game.tick(tick_commands)
+            cpu_time += time.process_time() - cpu_started
+            elapsed += time.perf_counter() - started
+    finally:
+        gc.enable()
+
+    return elapsed / len(commands), cpu_time / len(commands)
+
+
+def sorted_log(log):
+    # tiles log units and actions in tile order
+    return [
+        {name: sorted(json.dumps(item, sort_keys=True) for item in items) for name, items in tick_log.items()}
+        for tick_log in log
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--units', type=int, default=200000)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    compiled_map = CompiledMap(compile_map(make_map(1, args.units)))
+    options = {'max_ticks': None, 'stalemate_ticks': None}
+
+    # commands are generated from the state of the serial game, outside of the timing
+    rng = random.Random(args.seed)
+    game = compiled_map.new_game(**options)
+    commands = []
+    serial = 0.0
+    for _ in range(args.ticks):
+        commands.append(random_commands(rng, game))
+        serial += play(game, commands[-1:])[0]
+    serial /= args.ticks
+    log = sorted_log(game.log)
+
+    print(f'units: {args.units}, cpus: {os.cpu_count()}')
+    print(f'single process: {serial * 1000:.1f} ms/tick')
+
+    for num_tiles in args.workers:
+        timed_game = TimedParallelGame(compiled_map.new_game(**options), num_tiles)
+        elapsed, _ = play(timed_game, commands)
+        master = elapsed - timed_game.tile_time / args.ticks
+        projected = master + timed_game.critical_time / args.ticks
+        print(f'{num_tiles} tiles in process: {elapsed * 1000:.1f} ms/tick, master {master * 1000:.1f} ms, '
+              f'projected with a core per tile {projected * 1000:.1f} ms ({serial / projected:.2f}x), '
+              f'same log: {sorted_log(timed_game.log) == log}')
+
+    for num_workers in args.workers:
+        with ParallelGame(compiled_map.new_game(**options), num_workers, num_workers) as parallel_game:
+            elapsed, master = play(parallel_game, commands)
+            same = sorted_log(parallel_game.log) == log
+        print(f'{num_workers} workers: {elapsed * 1000:.1f} ms/tick ({serial / elapsed:.2f}x), '
+              f'master CPU {master * 1000:.1f} ms, same log: {same}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Tick round trip of the TCP server under every network profile.
+
+    python benchmarks/tick_rtt.py --bots 8 --ticks 200
+
+For each profile a single match is played in this process against bots that
+answer every state immediately; bot sockets get the same options as the
+server ones. The tick duration of the server (state sent to all commands
+received) is the round trip, its percentiles are reported per profile along
+with the kernel round trip times when the profile measures them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import Game
+from network import PROFILES, configure_socket
+from runner import Server
+from utils import percentiles
+from load_test import STATE_LIMIT, make_map
+
+
+async def echo_bot(host, port, profile, padding):
+    reader, writer = await asyncio.open_connection(host, port, limit=STATE_LIMIT)
+    configure_socket(writer.get_extra_info('socket'), profile)
+    command = (json.dumps([{'action': 'padding', 'properties': {'data': 'x' * padding}}]) + '\n').encode()
+
+    try:
+        await reader.readline()
+        while await reader.readline():
+            writer.write(command)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_profile(name, args):
+    profile = PROFILES[name]
+    host = '127.0.0.1'
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+
+    game = Game.from_map_config(make_map(args.bots, args.units), max_ticks=args.ticks, stalemate_ticks=None)
+    server = Server(game, host, port, profile, log_path=None)
+    server_task = asyncio.create_task(server.run())
+    await asyncio.sleep(0.1)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(echo_bot(host, port, profile, args.padding) for _ in range(args.bots)))
+    elapsed = time.perf_counter() - started
+    server.server.close()
+    await server_task
+
+    summary = server.game_loop.summary()
+    report = {
+        'ticks': summary['ticks'],
+        'ticks_per_second': summary['ticks'] / elapsed,
+        'tick_rtt': summary['tick_duration'],
+    }
+    if profile.measure_rtt:
+        # samples of all the bots pooled, in milliseconds
+        rtts = [rtt * 1000 for client_rtts in server.game_loop.rtts.values() for rtt in client_rtts]
+        report['kernel_rtt_ms'] = {f'p{point}': value for point, value in percentiles(rtts).items()}
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bots', type=int, default=8)
+    parser.add_argument('--units', type=int, default=1)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--padding', type=int, default=0, help='Extra bytes in every command')
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    args = parser.parse_args()
+
+    print(json.dumps({name: asyncio.run(run_profile(name, args)) for name in args.profiles}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Periodic checkpoints of a running game.
+
+A checkpoint directory holds ``log.jsonl`` with one tick log per line, appended
+incrementally, and ``checkpoint.json``, the latest ``Game.to_checkpoint``
+snapshot, which is replaced atomically after the log lines it refers to are
+on disk. Encoding and writing happens in a background thread, the game loop
+only takes the snapshot.
+"""
+import asyncio
+import json
+import os
+import queue
+import threading
+
+from exceptions import InitializationError
+from game import Game
+from observers import Observer
+
+
+CHECKPOINT_INTERVAL = 10
+
+LOG_FILE = 'log.jsonl'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class CheckpointWriter(Observer):
+    def __init__(self, game, directory, interval=CHECKPOINT_INTERVAL):
+        self.game = game
+        self.directory = directory
+        self.interval = interval
+
+        self.pending_logs = []
+        self.queue = queue.Queue()
+        self.thread = None
+        self.checkpoints = 0
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if not self.game.log:
+            # new game, the checkpoint of a previous one must not be resumed with the new log
+            remove_checkpoint(self.directory)
+        truncate_log(os.path.join(self.directory, LOG_FILE), len(self.game.log))
+
+        self.thread = threading.Thread(target=self.write_checkpoints, daemon=True)
+        self.thread.start()
+
+    def on_tick(self, tick_log):
+        self.pending_logs.append(tick_log)
+        if len(self.pending_logs) >= self.interval or self.game.is_ended():
+            self.checkpoint()
+
+    async def stop(self):
+        if self.pending_logs:
+            self.checkpoint()
+
+        self.queue.put(None)
+        await asyncio.to_thread(self.thread.join)
+
+    def checkpoint(self):
+        self.queue.put((self.pending_logs, self.game.to_checkpoint()))
+        self.pending_logs = []
+        self.checkpoints += 1
+
+    def write_checkpoints(self):
+        log_path = os.path.join(self.directory, LOG_FILE)
+        checkpoint_path = os.path.join(self.directory, CHECKPOINT_FILE)
+
+        with open(log_path, 'a') as log_file:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+
+                tick_logs, checkpoint = item
+                log_file.writelines(json.dumps(tick_log) + '\n' for tick_log in tick_logs)
+                log_file.flush()
+                os.fsync(log_file.fileno())
+
+                tmp_path = checkpoint_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(checkpoint, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, checkpoint_path)
+
+
+def truncate_log(log_path, lines):
+    # drops ticks written after the checkpoint the game was resumed from
+    if not os.path.exists(log_path):
+        return
+
+    with open(log_path, 'rb+') as f:
+        for _ in range(lines):
+            f.readline()
+        f.truncate(f.tell())
+
+
+def remove_checkpoint(directory):
+    try:
+        os.remove(os.path.join(directory, CHECKPOINT_FILE))
+    except FileNotFoundError:
+        pass
+
+
+def has_checkpoint(directory):
+    return os.path.exists(os.path.join(directory, CHECKPOINT_FILE))
+
+
+def load_checkpoint(directory):
+    with open(os.path.join(directory, CHECKPOINT_FILE)) as f:
+        checkpoint = json.load(f)
+
+    log = []
+    with open(os.path.join(directory, LOG_FILE)) as f:
+        for _ in range(checkpoint['log_offset']):
+            line = f.readline()
+            if not line:
+                raise InitializationError('Log is shorter than the checkpoint')
+            log.append(json.loads(line))
+
+    return Game.from_checkpoint(checkpoint, log)
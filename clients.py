@@ -1,51 +1,151 @@
 import asyncio
 import json
 
+from network import PROFILES, configure_socket, socket_rtt
+from resources import ProcessUsage
 
-EXECUTION_TIMEOUT = 10.0
+
+# bytes queued to a client above which new frames are subject to backpressure policy
+HIGH_WATER_MARK = 1 << 20
+
+SKIP_FRAME = 'skip'
+DISCONNECT = 'disconnect'
+BACKPRESSURE_POLICIES = (SKIP_FRAME, DISCONNECT)
 
 
 class Client:
+    transport = None
+
     async def connect(self):
-        raise NotImplemented
+        raise NotImplementedError
 
     async def send_message(self, msg):
-        raise NotImplemented
+        raise NotImplementedError
+
+    def send_frame(self, frame):
+        # writes already encoded newline terminated message without waiting
+        raise NotImplementedError
+
+    def write_buffer_size(self):
+        raise NotImplementedError
+
+    def flush(self):
+        # sends what was coalesced during the tick
+        pass
+
+    def rtt(self):
+        # round trip time in seconds if the transport measures it
+        return None
+
+    def cpu_time(self):
+        # CPU seconds used by the strategy so far if it runs locally
+        return None
+
+    def peak_rss(self):
+        return None
 
     async def get_command(self):
-        raise NotImplemented
+        raise NotImplementedError
 
     def disconnect(self):
-        raise NotImplemented
+        raise NotImplementedError
 
 
 class ProcessClient(Client):
+    transport = 'pipe'
+
     def __init__(self, process):
         self.process = process
+        self.usage = ProcessUsage(process.pid)
 
     async def send_message(self, msg):
         self.process.stdin.write((msg+'\n').encode())
         await self.process.stdin.drain()
 
+    def send_frame(self, frame):
+        self.process.stdin.write(frame)
+
+    def write_buffer_size(self):
+        return self.process.stdin.transport.get_write_buffer_size()
+
+    def cpu_time(self):
+        return self.usage.sample()
+
+    def peak_rss(self):
+        return self.usage.peak_rss
+
     async def get_command(self):
         command = await self.process.stdout.readline()
+        if not command:
+            raise ConnectionResetError('Strategy closed its output')
         return json.loads(command)
 
     def disconnect(self):
-        self.process.kill()
+        # last sample while the tree is alive, killed even if sampling fails
+        try:
+            self.usage.sample()
+        finally:
+            self.process.kill()
+
+
+class SharedMemoryClient(ProcessClient):
+    # state goes through the shared state ring, only its sequence number is sent to the pipe
+    transport = 'shm'
+
+    def __init__(self, process, shared_state):
+        super().__init__(process)
+        self.shared_state = shared_state
+
+    def send_frame(self, frame):
+        self.process.stdin.write(self.shared_state.notification)
 
 
 class TCPClient(Client):
-    def __init__(self, reader, writer):
+    transport = 'tcp'
+
+    def __init__(self, reader, writer, profile=PROFILES['default']):
         self.reader = reader
         self.writer = writer
+        self.profile = profile
+        self.socket = writer.get_extra_info('socket')
+        # messages waiting for flush when writes are coalesced
+        self.pending = []
+
+        configure_socket(self.socket, profile)
 
     async def send_message(self, msg):
         msg_bytes = (msg+'\n').encode()
+        if self.profile.coalesce:
+            self.pending.append(msg_bytes)
+            return
+
         self.writer.write(msg_bytes)
+        await self.writer.drain()
+
+    def send_frame(self, frame):
+        if self.profile.coalesce:
+            self.pending.append(frame)
+        else:
+            self.writer.write(frame)
+
+    def flush(self):
+        if self.pending:
+            self.writer.write(b''.join(self.pending) if len(self.pending) > 1 else self.pending[0])
+            self.pending.clear()
+
+    def write_buffer_size(self):
+        # pending messages belong to the current tick, they are not a backlog of the client
+        return self.writer.transport.get_write_buffer_size()
+
+    def rtt(self):
+        if not self.profile.measure_rtt:
+            return None
+        return socket_rtt(self.socket)
 
     async def get_command(self):
         command = await self.reader.readline()
+        if not command:
+            raise ConnectionResetError('Client closed the connection')
         return json.loads(command.decode())
 
     def disconnect(self):
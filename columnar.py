@@ -0,0 +1,235 @@
+"""Columnar export of game logs for bulk analytics.
+
+A game is stored as a NumPy ``.npz`` file of flat int32 columns named
+``<table>.<column>``, which map one to one onto Arrow/Parquet tables:
+
+* ``positions``: ``tick``, ``unit_id``, ``x``, ``y``
+* ``actions``: ``tick``, ``kind`` (``ACTION_KINDS``), ``unit_id``, ``x``, ``y`` (-1 for teleport)
+* ``units``: ``unit_id``, ``team``, ``spawn_x``, ``spawn_y`` (only when the map config is known)
+* ``map``: ``width``, ``height``
+* ``deaths``: ``tick``, ``unit_id``, ``x``, ``y``, the cell after the moves of the tick
+  where the unit was shot or killed on its spawn
+* ``game``: ``ticks``, the number of ticks played
+
+Deaths need the units before the first tick, from the map config or the
+positions of the game; without them units dying on the first tick are missing.
+
+Ticks are numbered from 1, as ``Game.ticks`` after the tick.
+
+    python columnar.py export result.json result.npz --map map.json
+    python columnar.py aggregate games/*.npz --output stats.npz
+"""
+from array import array
+import argparse
+import asyncio
+import json
+
+import numpy as np
+
+from game import Game
+from observers import Observer
+
+
+ACTION_KINDS = {
+    'move': 0,
+    'fire': 1,
+    'teleport': 2,
+}
+
+TABLES = {
+    'positions': ('tick', 'unit_id', 'x', 'y'),
+    'actions': ('tick', 'kind', 'unit_id', 'x', 'y'),
+    'units': ('unit_id', 'team', 'spawn_x', 'spawn_y'),
+    'map': ('width', 'height'),
+    'deaths': ('tick', 'unit_id', 'x', 'y'),
+    'game': ('ticks',),
+}
+
+
+class ColumnarWriter:
+    def __init__(self, map_config=None, positions=None):
+        # positions are unit id -> cell before the first written tick, spawns by default
+        self.columns = {
+            f'{table}.{column}': array('i')
+            for table, columns in TABLES.items()
+            for column in columns
+        }
+        self.ticks = 0
+        # unit id -> spawn and cell after the last tick, for the cells of the deaths
+        self.spawns = {}
+
+        if map_config is not None:
+            self.columns['map.width'].append(map_config['map_width'])
+            self.columns['map.height'].append(map_config['map_height'])
+            for unit in map_config['units']:
+                self.append('units', unit['id'], unit['team'], unit['spawn_x'], unit['spawn_y'])
+                self.spawns[unit['id']] = (unit['spawn_x'], unit['spawn_y'])
+
+        self.positions = dict(positions) if positions is not None else dict(self.spawns)
+
+    def append(self, table, *values):
+        for column, value in zip(TABLES[table], values):
+            self.columns[f'{table}.{column}'].append(value)
+
+    def add_tick(self, tick, tick_log):
+        # the last ticks may have no units, so the tick count is stored on its own
+        self.ticks = tick
+        for unit in tick_log['units']:
+            self.append('positions', tick, unit['id'], unit['x'], unit['y'])
+
+        # logged moves are the successful ones
+        targets = {}
+        for action in tick_log['actions']:
+            properties = action['properties']
+            self.append('actions', tick, ACTION_KINDS[action['action']], properties['unit_id'],
+                        properties.get('x', -1), properties.get('y', -1))
+            if action['action'] == 'move':
+                targets[properties['unit_id']] = (properties['x'], properties['y'])
+            elif action['action'] == 'teleport' and properties['unit_id'] in self.spawns:
+                targets[properties['unit_id']] = self.spawns[properties['unit_id']]
+
+        # units missing from the log died after the moves of the tick
+        positions = {unit['id']: (unit['x'], unit['y']) for unit in tick_log['units']}
+        for unit_id, position in self.positions.items():
+            if unit_id not in positions:
+                self.append('deaths', tick, unit_id, *targets.get(unit_id, position))
+        self.positions = positions
+
+    def save(self, path):
+        self.columns['game.ticks'] = array('i', [self.ticks])
+        np.savez_compressed(path, **{name: np.frombuffer(column, dtype=np.int32) if column else
+                                     np.zeros(0, dtype=np.int32) for name, column in self.columns.items()})
+
+
+class ColumnarSink(Observer):
+    # writes the game straight to the columnar format without the JSON log
+    def __init__(self, game, path):
+        self.game = game
+        self.path = path
+        self.writer = ColumnarWriter(game.map_config, {unit.id: unit.position for unit in game.units.values()})
+
+    def on_tick(self, tick_log):
+        self.writer.add_tick(self.game.ticks, tick_log)
+
+    async def stop(self):
+        await asyncio.to_thread(self.writer.save, self.path)
+
+
+def export_log(log, path, map_config=None, positions=None):
+    writer = ColumnarWriter(map_config, positions)
+    for tick, tick_log in enumerate(log, start=1):
+        writer.add_tick(tick, tick_log)
+    writer.save(path)
+
+
+def load(path):
+    with np.load(path) as data:
+        tables = {table: {} for table in TABLES}
+        for name in data.files:
+            table, column = name.split('.', 1)
+            tables[table][column] = data[name]
+
+    return tables
+
+
+def game_ticks(game):
+    # files written before the tick count was stored end at the last tick with units
+    if len(game['game'].get('ticks', ())):
+        return int(game['game']['ticks'][0])
+    return int(game['positions']['tick'].max()) if len(game['positions']['tick']) else 0
+
+
+def final_units(positions, ticks):
+    # unit ids alive after the last tick
+    return positions['unit_id'][positions['tick'] == ticks]
+
+
+def death_positions(positions, last_tick):
+    # files without the deaths table: position of every unit at its last logged tick
+    # if it is before the end of the game
+    ticks = positions['tick']
+    if not len(ticks):
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    order = np.lexsort((ticks, positions['unit_id']))
+    unit_ids = positions['unit_id'][order]
+    last = np.append(unit_ids[1:] != unit_ids[:-1], True)
+    last_rows = order[last]
+
+    dead = ticks[last_rows] < last_tick
+    return positions['x'][last_rows[dead]], positions['y'][last_rows[dead]]
+
+
+def aggregate(paths):
+    games = [load(path) for path in paths]
+
+    width = max([int(game['map']['width'][0]) for game in games if len(game['map']['width'])] +
+                [int(game['positions']['x'].max()) + 1 for game in games if len(game['positions']['x'])] + [0])
+    height = max([int(game['map']['height'][0]) for game in games if len(game['map']['height'])] +
+                 [int(game['positions']['y'].max()) + 1 for game in games if len(game['positions']['y'])] + [0])
+
+    heatmap = np.zeros((height, width), dtype=np.int64)
+    kill_map = np.zeros((height, width), dtype=np.int64)
+    wins = {}
+    games_with_teams = 0
+
+    for game in games:
+        positions = game['positions']
+        ticks = game_ticks(game)
+        np.add.at(heatmap, (positions['y'], positions['x']), 1)
+
+        deaths = game['deaths']
+        if 'tick' in deaths:
+            dead_x, dead_y = deaths['x'], deaths['y']
+        else:
+            dead_x, dead_y = death_positions(positions, ticks)
+        np.add.at(kill_map, (dead_y, dead_x), 1)
+
+        units = game['units']
+        if not len(units['unit_id']):
+            continue
+
+        # winners are teams with the most units left, as in Game.get_winners
+        games_with_teams += 1
+        team_of = dict(zip(units['unit_id'].tolist(), units['team'].tolist()))
+        teams = np.array([team_of[unit_id] for unit_id in final_units(positions, ticks).tolist()], dtype=np.int64)
+        if len(teams):
+            team_sizes = np.bincount(teams)
+            for team in np.flatnonzero(team_sizes == team_sizes.max()).tolist():
+                wins[team] = wins.get(team, 0) + 1
+
+    return {
+        'games': len(games),
+        'win_rates': {team: count / games_with_teams for team, count in sorted(wins.items())},
+        'heatmap': heatmap,
+        'kill_map': kill_map,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Convert a JSON game log')
+    export_parser.add_argument('log', type=argparse.FileType(mode='r'))
+    export_parser.add_argument('output', type=str)
+    export_parser.add_argument('--map', type=argparse.FileType(mode='r'), help='Map file to store units and teams')
+
+    aggregate_parser = subparsers.add_parser('aggregate', help='Win rates, heatmaps and kill maps of many games')
+    aggregate_parser.add_argument('games', type=str, nargs='+')
+    aggregate_parser.add_argument('--output', type=str, help='Where to save heatmap and kill map arrays')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if args.map is not None:
+            game = Game.from_map_config(json.load(args.map))
+            map_config, positions = game.map_config, {unit.id: unit.position for unit in game.units.values()}
+        else:
+            map_config, positions = None, None
+        export_log(json.load(args.log), args.output, map_config, positions)
+    else:
+        stats = aggregate(args.games)
+        if args.output is not None:
+            np.savez_compressed(args.output, heatmap=stats['heatmap'], kill_map=stats['kill_map'])
+        print(json.dumps({'games': stats['games'], 'win_rates': stats['win_rates']}, indent=2))
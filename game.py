@@ -1,21 +1,42 @@
 from itertools import chain
-from collections import defaultdict, Counter
+from collections import Counter
 import json
 
 from exceptions import InitializationError, InvalidAction
 from utils import is_coordinate, inside_rectangle
 from actions import Fire, create_action, split_actions
+from action_masks import ActionMasks
+
+
+MAX_TICKS = 100
+# ticks without any kill or unit changing its position after which the game is a draw
+STALEMATE_TICKS = 20
+
+# reasons of the game end
+ONE_TEAM_LEFT = 'one_team_left'
+NO_UNITS = 'no_units'
+STALEMATE = 'stalemate'
+TICK_LIMIT = 'tick_limit'
+
+# a unit standing on or next to an enemy spawn kills the enemy
+SPAWN_KILL_OFFSETS = ((0, 0), (1, 0), (-1, 0), (0, 1), (0, -1))
 
 
 class Game:
-    __slots__ = ('width', 'height', 'units', 'ticks', 'team_count', 'remaining_teams',
-                 'map_config', 'log')
+    __slots__ = ('width', 'height', 'units', 'occupancy', 'spawns', 'ticks', 'team_count', 'remaining_teams',
+                 'map_config', 'map_config_json', 'log', 'action_masks', 'max_ticks', 'stalemate_ticks', 'idle_ticks',
+                 'end_reason')
 
-    def __init__(self, width, height, teams):
+    def __init__(self, width, height, teams, max_ticks=MAX_TICKS, stalemate_ticks=STALEMATE_TICKS):
         self.width = width
         self.height = height
 
         self.units = self.validate_teams(teams)
+        # position -> unit index, kept in sync with every move and death
+        self.occupancy = {unit.position: unit for unit in self.units.values()}
+        # spawn -> unit, only alive units
+        self.spawns = {unit.spawn: unit for unit in self.units.values()}
+        self.team_count = len(teams)
         self.remaining_teams = set(range(len(teams)))
 
         self.map_config = {
@@ -26,8 +47,17 @@ class Game:
                 for unit in self.units.values()
             ]
         }
+        # serialized on the first use, compiled maps have it ready
+        self.map_config_json = None
 
+        self.ticks = 0
         self.log = []
+        self.action_masks = ActionMasks(width, height)
+
+        self.max_ticks = max_ticks
+        self.stalemate_ticks = stalemate_ticks
+        self.idle_ticks = 0
+        self.end_reason = None
 
     def validate_teams(self, teams):
         # TODO spawns
@@ -93,7 +123,7 @@ class Game:
         return units
 
     @classmethod
-    def from_map_config(cls, config):
+    def from_map_config(cls, config, **options):
         try:
             width = config['map_width']
             height = config['map_height']
@@ -105,7 +135,89 @@ class Game:
         except KeyError:
             raise InitializationError('Undefined "teams"')
 
-        return Game(width, height, teams)
+        return Game(width, height, teams, **options)
+
+    def to_checkpoint(self):
+        # compact snapshot of the whole game except the log, which is saved incrementally
+        return {
+            'width': self.width,
+            'height': self.height,
+            'team_count': self.team_count,
+            'map_config': self.map_config,
+            'units': [
+                [unit.id, unit.team, *unit.spawn, *unit.position]
+                for unit in self.units.values()
+            ],
+            'remaining_teams': sorted(self.remaining_teams),
+            'ticks': self.ticks,
+            'idle_ticks': self.idle_ticks,
+            'end_reason': self.end_reason,
+            'max_ticks': self.max_ticks,
+            'stalemate_ticks': self.stalemate_ticks,
+            'log_offset': len(self.log),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, log):
+        # checkpoints are written by the game itself so no validation is needed
+        game = cls.__new__(cls)
+        game.width = checkpoint['width']
+        game.height = checkpoint['height']
+        game.team_count = checkpoint['team_count']
+        game.map_config = checkpoint['map_config']
+        game.map_config_json = None
+
+        game.units = {}
+        for unit_id, team, spawn_x, spawn_y, x, y in checkpoint['units']:
+            game.units[unit_id] = Unit(unit_id, team, (spawn_x, spawn_y), (x, y))
+        game.occupancy = {unit.position: unit for unit in game.units.values()}
+        game.spawns = {unit.spawn: unit for unit in game.units.values()}
+        game.remaining_teams = set(checkpoint['remaining_teams'])
+
+        game.ticks = checkpoint['ticks']
+        game.log = list(log)
+        game.action_masks = ActionMasks(game.width, game.height)
+
+        game.max_ticks = checkpoint['max_ticks']
+        game.stalemate_ticks = checkpoint['stalemate_ticks']
+        game.idle_ticks = checkpoint['idle_ticks']
+        game.end_reason = checkpoint['end_reason']
+
+        if len(game.log) != checkpoint['log_offset']:
+            raise InitializationError('Log does not match the checkpoint')
+
+        return game
+
+    @classmethod
+    def from_compiled(cls, compiled_map, max_ticks=MAX_TICKS, stalemate_ticks=STALEMATE_TICKS):
+        # compiled maps are validated when compiled, see map_cache
+        game = cls.__new__(cls)
+        game.width = compiled_map.width
+        game.height = compiled_map.height
+        game.team_count = compiled_map.team_count
+        # shared by all the games of the map, never modified
+        game.map_config = compiled_map.map_config
+        game.map_config_json = compiled_map.map_config_json
+
+        game.units = {}
+        occupancy = game.occupancy = {}
+        spawns = game.spawns = {}
+        for unit_id, team, spawn_x, spawn_y, x, y in compiled_map.units:
+            unit = game.units[unit_id] = Unit(unit_id, team, (spawn_x, spawn_y), (x, y))
+            occupancy[unit.position] = unit
+            spawns[unit.spawn] = unit
+        game.remaining_teams = set(range(game.team_count))
+
+        game.ticks = 0
+        game.log = []
+        game.action_masks = compiled_map.action_masks
+
+        game.max_ticks = max_ticks
+        game.stalemate_ticks = stalemate_ticks
+        game.idle_ticks = 0
+        game.end_reason = None
+
+        return game
 
     def __str__(self):
         field = [['-' for _ in range(self.width)] for _ in range(self.height)]
@@ -122,25 +234,44 @@ class Game:
 
     def tick(self, team_commands):
         actions = self.validate_commands(team_commands)
+        self.apply_actions(actions)
+
+    def apply_actions(self, actions):
+        # actions must be already validated
         move_actions, fire_actions = split_actions(actions)
         busy_positions, non_conflict_moves = self.resolve_move_conflicts(move_actions)
 
-        for move_action in non_conflict_moves:
-            move_action.apply(busy_positions)
+        unit_count = len(self.units)
+        moved = any(move_action.target != move_action.unit.position for move_action in non_conflict_moves)
+
+        self.apply_moves(non_conflict_moves)
 
         dead_units = self.spawn_kills()
         # dead units can't fire
         fire_actions = [action for action in fire_actions if action.unit not in dead_units]
 
-        self.fire(fire_actions)
-        self.refresh_remaining_teams()
+        fire_stats = self.fire(fire_actions)
 
+        self.refresh_remaining_teams()
         tick_log = {
             'units': [unit.render_state() for unit in self.units.values()],
-            'actions': [action.render() for action in chain(non_conflict_moves, fire_actions)]
+            'actions': [action.render() for action in chain(non_conflict_moves, fire_actions)],
+            'fire_stats': fire_stats
         }
+        self.end_tick(tick_log, moved or len(self.units) != unit_count)
 
+    def end_tick(self, tick_log, changed):
+        # logs the tick and checks the end of the game, changed is whether any unit moved or died.
+        # Remaining teams must be already refreshed
         self.log.append(tick_log)
+        self.ticks += 1
+
+        if changed:
+            self.idle_ticks = 0
+        else:
+            self.idle_ticks += 1
+
+        self.end_reason = self.get_end_reason()
 
     def validate_commands(self, team_commands):
         valid_actions = []
@@ -159,39 +290,107 @@ class Game:
         return valid_actions
 
     def resolve_move_conflicts(self, move_actions):
-        # the unit performs an action if no one else moves to the target
-        # and target is free cell or will be free after moves
-        target_moves = defaultdict(list)
+        # All moves are simultaneous and resolved in O(moves):
+        # - a unit with several moves and units moving to the same cell don't move
+        # - a move succeeds if its target is free or is left by a unit that moves,
+        #   so whole chains and rotation cycles (swaps included) move together
+        # - a chain ending at a unit that stays is blocked entirely
+        # Returns positions of the units whose moves failed and moves that succeed
+        unit_moves = {}
+        several_moves = set()
         for move_action in move_actions:
-            target_moves[move_action.target].append(move_action)
+            if move_action.unit in unit_moves:
+                several_moves.add(move_action.unit)
+            unit_moves[move_action.unit] = move_action
+
+        target_claims = Counter(move_action.target for move_action in unit_moves.values())
 
-        non_conflict_moves = [moves[0] for moves in target_moves.values() if len(moves) == 1]
-        # units with the same target do not move
-        is_not_moving = set(self.units.values()) - set(move.unit for move in non_conflict_moves)
+        # move graph: every candidate depends on the unit standing at its target.
+        # Targets are unique, so each unit is a dependency of at most one move
+        candidates = {
+            unit: move_action for unit, move_action in unit_moves.items()
+            if unit not in several_moves and target_claims[move_action.target] == 1
+        }
+
+        succeeded = {}
+        for move_action in candidates.values():
+            if move_action.unit in succeeded:
+                continue
 
-        busy_positions = {unit.position for unit in is_not_moving}
+            path = []
+            on_path = set()
+            current = move_action
+            while True:
+                path.append(current)
+                on_path.add(current.unit)
+
+                occupant = self.occupancy.get(current.target)
+                if occupant is None:
+                    result = True
+                    break
+                if occupant in on_path:
+                    # cycle closes on the first move of the path
+                    result = True
+                    break
+                if occupant in succeeded:
+                    result = succeeded[occupant]
+                    break
+                if occupant not in candidates:
+                    result = False
+                    break
+
+                current = candidates[occupant]
+
+            for path_move in path:
+                succeeded[path_move.unit] = result
+
+        non_conflict_moves = [move_action for move_action in candidates.values() if succeeded[move_action.unit]]
+        busy_positions = {unit.position for unit in unit_moves if not succeeded.get(unit, False)}
 
         return busy_positions, non_conflict_moves
 
+    def apply_moves(self, move_actions):
+        # all the cells are left before any is taken
+        for move_action in move_actions:
+            del self.occupancy[move_action.unit.position]
+
+        for move_action in move_actions:
+            move_action.apply()
+            self.occupancy[move_action.target] = move_action.unit
+
     def spawn_kills(self):
+        # only the cells around every unit are looked up in the spawn index
+        spawns = self.spawns
         dead_units_ids = []
         for killer in self.units.values():
             killer_x, killer_y = killer.position
 
-            for victim in self.units.values():
-                if victim.team == killer.team:
-                    continue
-
-                spawn_x, spawn_y = victim.spawn
-                if abs(spawn_x - killer_x) + abs(spawn_y - killer_y) <= 1:
+            for dx, dy in SPAWN_KILL_OFFSETS:
+                victim = spawns.get((killer_x + dx, killer_y + dy))
+                if victim is not None and victim.team != killer.team:
                     dead_units_ids.append(victim.id)
 
-        dead_units = {self.units.pop(unit_id) for unit_id in dead_units_ids}
+        dead_units = {self.remove_unit(unit_id) for unit_id in dead_units_ids if unit_id in self.units}
         return dead_units
 
     def fire(self, fire_actions):
+        # all shots are simultaneous: victims of all the target cells are found first
+        # and removed together, so every shooter fires regardless of the order.
+        # Returns shots and hits of every shooter
+        targets = {fire_action.target for fire_action in fire_actions}
+        victims = {target: self.occupancy[target] for target in targets if target in self.occupancy}
+
+        for victim in victims.values():
+            self.remove_unit(victim.id)
+
+        fire_stats = {}
         for fire_action in fire_actions:
-            fire_action.apply()
+            stats = fire_stats.setdefault(fire_action.unit.id, {'unit_id': fire_action.unit.id, 'shots': 0, 'hits': 0})
+            stats['shots'] += 1
+            if fire_action.target in victims:
+                stats['hits'] += 1
+
+        return list(fire_stats.values())
 
     def refresh_remaining_teams(self):
         self.remaining_teams = {unit.team for unit in self.units.values()}
@@ -199,11 +398,16 @@ class Game:
     def get_unit_by_id(self, unit_id):
         return self.units.get(unit_id, None)
 
+    def remove_unit(self, unit_id):
+        unit = self.units.pop(unit_id)
+        del self.occupancy[unit.position]
+        del self.spawns[unit.spawn]
+        return unit
+
     def remove_unit_at(self, position):
-        for unit in self.units.values():
-            if unit.position == position:
-                self.units.pop(unit.id)
-                break
+        unit = self.occupancy.get(position)
+        if unit is not None:
+            self.remove_unit(unit.id)
 
     def get_winners(self):
         # count units in teams
@@ -226,15 +430,60 @@ class Game:
     def get_current_state(self):
         return self.log[-1]
 
+    def get_state(self):
+        # state before the first tick has no actions yet
+        if self.log:
+            return self.get_current_state()
+
+        return {
+            'units': [unit.render_state() for unit in self.units.values()],
+            'actions': [],
+            'fire_stats': []
+        }
+
+    def get_legal_actions(self, team=None):
+        # unit id -> (move mask, fire mask) for units of the team or all the units
+        unit_masks = self.action_masks.unit_masks
+        return {
+            unit.id: unit_masks(unit.position)
+            for unit in self.units.values()
+            if team is None or unit.team == team
+        }
+
+    def render_legal_actions(self):
+        return [
+            {'unit_id': unit_id, 'move': move_mask, 'fire': fire_mask}
+            for unit_id, (move_mask, fire_mask) in self.get_legal_actions().items()
+        ]
+
     def get_map_config(self, from_perspective):
         return {**self.map_config, 'my_team_id': from_perspective}
 
+    def render_map_config(self, from_perspective):
+        # map config message without serializing the units again for every team
+        if self.map_config_json is None:
+            self.map_config_json = json.dumps(self.map_config)
+        return f'{self.map_config_json[:-1]}, "my_team_id": {from_perspective}}}'
+
     def save_log(self, path):
         with open(path, 'w') as f:
             json.dump(self.log, f)
 
+    def get_end_reason(self):
+        if not self.remaining_teams:
+            return NO_UNITS
+        # single team maps are played until other conditions
+        if self.team_count > 1 and len(self.remaining_teams) == 1:
+            return ONE_TEAM_LEFT
+        if self.stalemate_ticks is not None and self.idle_ticks >= self.stalemate_ticks:
+            return STALEMATE
+        if self.max_ticks is not None and self.ticks >= self.max_ticks:
+            return TICK_LIMIT
+
+        return None
+
     def is_ended(self):
-        return False
+        return self.end_reason is not None
 
 
 class Unit:
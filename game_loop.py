@@ -1,63 +1,132 @@
-from exceptions import InvalidAction
-from actions import parse_action
+from action_masks import MOVE_OFFSETS, FIRE_OFFSETS
+from clients import HIGH_WATER_MARK, SKIP_FRAME, DISCONNECT, BACKPRESSURE_POLICIES
+from time_bank import TimeBank, TICK_TIMEOUT, TIME_BANK
+from utils import percentiles
 import asyncio
 import json
+import time
 
 
 RESPONSE_TIMEOUT = 2.0
-EXECUTION_TIMEOUT = 5.0
-MAX_TICKS = 100
+# with CPU time accounting wall clock only catches hung strategies, so it is that many times looser
+CPU_WALL_FACTOR = 4
 
 
 class GameLoop:
-    def __init__(self, game, clients):
+    def __init__(self, game, clients, tick_timeout=TICK_TIMEOUT, time_bank=TIME_BANK,
+                 high_water_mark=HIGH_WATER_MARK, backpressure_policy=SKIP_FRAME, shared_state=None,
+                 observers=(), legal_actions=False, report_rtt=False, cpu_accounting=False,
+                 log_path='result.json'):
+        if backpressure_policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'Unknown backpressure policy {backpressure_policy!r}')
+
         self.game = game
         self.clients = dict(enumerate(clients))
+        # disconnected clients included, for the summary
+        self.all_clients = dict(self.clients)
+        self.time_banks = {client_id: TimeBank(tick_timeout, time_bank) for client_id in self.clients}
+
+        self.high_water_mark = high_water_mark
+        self.backpressure_policy = backpressure_policy
+        self.skipped_frames = dict.fromkeys(self.clients, 0)
+
+        # ring buffer for clients on the shared memory transport
+        self.shared_state = shared_state
+        # consumers of the tick logs: viewers, spectators, sinks
+        self.observers = list(observers)
+        # include legal action masks of all the units into the state
+        self.legal_actions = legal_actions
+
+        # send round trip times of clients measured by the transports with the state
+        self.report_rtt = report_rtt
+        self.rtts = {client_id: [] for client_id in self.clients}
+
+        # charge time banks with CPU time of local strategies instead of wall time,
+        # so they do not pay for contention with their neighbours
+        self.cpu_accounting = cpu_accounting
+
+        # clients disconnected because of timeouts, broken connections or backpressure
+        self.failed_clients = []
+        self.tick_durations = []
+
+        self.log_path = log_path
 
     async def play(self):
+        for observer in self.observers:
+            await observer.start()
+
+        # teams of a resumed game may be already dead
+        for client_id in set(self.clients) - self.game.remaining_teams:
+            self.disconnect_client(client_id, failed=False)
+
         # send map config
         await self.send_messages([
-            self.send_message_wrapper(client_id, json.dumps(self.game.get_map_config(client_id)))
+            self.send_message_wrapper(client_id, self.render_map_config(client_id))
             for client_id in self.clients
         ])
 
         # game
-        while not self.game.is_ended() and self.clients and self.game.ticks < MAX_TICKS:
-            # send game state
-            state = json.dumps(self.game.get_state())
-            await self.send_messages([self.send_message_wrapper(client_id, state) for client_id in self.clients])
+        while not self.game.is_ended() and self.clients:
+            tick_started = time.perf_counter()
 
-            commands = await self.get_commands()
+            # send game state, clients that skipped the frame sit this tick out
+            if self.shared_state is not None:
+                self.shared_state.publish(self.game.ticks, self.game.units.values())
 
-            client_actions = {}
-            for client_id, command in commands:
-                if command is None:
-                    continue
+            if any(client.transport != 'shm' for client in self.clients.values()):
+                state = self.game.get_state()
+                if self.legal_actions:
+                    state = {**state, 'legal_actions': self.game.render_legal_actions()}
+                if self.report_rtt:
+                    state = {**state, 'rtt': self.measure_rtts()}
+                state = json.dumps(state)
+            else:
+                state = ''
 
-                actions = []
-                for action in command:
-                    try:
-                        action = parse_action(action)
-                    except InvalidAction:
-                        pass
-                    else:
-                        actions.append(action)
+            receivers = self.broadcast(state)
+
+            commands = await self.get_commands(receivers)
+            client_commands = {client_id: command for client_id, command in commands if isinstance(command, list)}
 
-                if actions:
-                    client_actions[client_id] = actions
+            self.game.tick(client_commands)
 
-            self.game.tick(client_actions)
-            print(self.game)
+            tick_log = self.game.get_current_state()
+            for observer in self.observers:
+                observer.on_tick(tick_log)
 
             # remove clients that died this tick
             dead_clients = set(self.clients.keys()) - self.game.remaining_teams
             for dead_client in dead_clients:
-                self.disconnect_client(dead_client)
+                self.disconnect_client(dead_client, failed=False)
+
+            self.tick_durations.append(time.perf_counter() - tick_started)
 
-        self.game.save_log('result.json')
+        # game is over, let the remaining clients know
+        for client_id in list(self.clients):
+            self.disconnect_client(client_id, failed=False)
 
-    async def get_commands(self):
-        client_ids = list(self.clients.keys())
+        for observer in self.observers:
+            await observer.stop()
+
+        if self.log_path is not None:
+            self.game.save_log(self.log_path)
+
+    def render_map_config(self, client_id):
+        if self.clients[client_id].transport == 'shm' or self.legal_actions:
+            return json.dumps(self.get_map_config(client_id))
+        # plain map config is serialized once per game
+        return self.game.render_map_config(client_id)
+
+    def get_map_config(self, client_id):
+        map_config = self.game.get_map_config(client_id)
+        if self.clients[client_id].transport == 'shm':
+            map_config['shared_state'] = self.shared_state.describe()
+        if self.legal_actions:
+            map_config['legal_action_offsets'] = {'move': MOVE_OFFSETS, 'fire': FIRE_OFFSETS}
+
+        return map_config
+
+    async def get_commands(self, client_ids):
         commands = await asyncio.gather(*(self.get_command_wrapper(client_id) for client_id in client_ids))
         client_commands = [
             (client_id, command)
@@ -67,12 +136,34 @@ class GameLoop:
         return client_commands
 
     async def get_command_wrapper(self, client_id):
-        # requests command but if it fails disconnects client
+        # requests command, time above the tick allowance is drawn from the client's time bank.
+        # Client is disconnected only if the bank is exhausted or the connection is broken
+        client = self.clients[client_id]
+        time_bank = self.time_banks[client_id]
+        timeout = time_bank.available()
+        cpu_started = client.cpu_time() if self.cpu_accounting else None
+        if cpu_started is not None:
+            timeout *= CPU_WALL_FACTOR
+
+        started = time.perf_counter()
         try:
-            return await asyncio.wait_for(self.clients[client_id].get_command(), timeout=EXECUTION_TIMEOUT)
+            command = await asyncio.wait_for(client.get_command(), timeout=timeout)
+        except ValueError:
+            # malformed command, the client is still in sync so just skip its turn
+            command = None
         except:
+            command = None
             self.disconnect_client(client_id)
-            return None
+
+        if cpu_started is not None:
+            time_bank.charge(client.cpu_time() - cpu_started)
+            if time_bank.exhausted:
+                self.disconnect_client(client_id)
+                return None
+        else:
+            time_bank.charge(time.perf_counter() - started)
+
+        return command
 
     async def send_message_wrapper(self, client_id, msg):
         # send message but if it fails disconnect client
@@ -81,9 +172,82 @@ class GameLoop:
         except:
             self.disconnect_client(client_id)
 
+    def broadcast(self, msg):
+        # frame is encoded once and the same immutable buffer is written to every client.
+        # Returns ids of the clients that received the frame
+        frame = (msg + '\n').encode()
+
+        receivers = []
+        for client_id, client in list(self.clients.items()):
+            try:
+                if client.write_buffer_size() > self.high_water_mark:
+                    if self.backpressure_policy == DISCONNECT:
+                        self.disconnect_client(client_id)
+                    else:
+                        self.skipped_frames[client_id] += 1
+                    continue
+
+                client.send_frame(frame)
+            except:
+                self.disconnect_client(client_id)
+            else:
+                receivers.append(client_id)
+
+        # clients whose write failed on the flush are gone
+        self.flush()
+        return [client_id for client_id in receivers if client_id in self.clients]
+
+    def flush(self):
+        # one write per client and tick with the coalescing transports
+        for client_id, client in list(self.clients.items()):
+            try:
+                client.flush()
+            except:
+                self.disconnect_client(client_id)
+
+    def measure_rtts(self):
+        # client id -> round trip time in milliseconds
+        rtts = {}
+        for client_id, client in self.clients.items():
+            rtt = client.rtt()
+            if rtt is not None:
+                self.rtts[client_id].append(rtt)
+                rtts[client_id] = rtt * 1000
+
+        return rtts
+
     async def send_messages(self, send_fs):
         if send_fs:
-            await asyncio.wait(send_fs)
-
-    def disconnect_client(self, client_id):
-        self.clients.pop(client_id).disconnect()
+            await asyncio.gather(*send_fs)
+
+    def disconnect_client(self, client_id, failed=True):
+        client = self.clients.pop(client_id, None)
+        if client is not None:
+            client.disconnect()
+            if failed:
+                self.failed_clients.append(client_id)
+
+    def summary(self):
+        return {
+            'ticks': self.game.ticks,
+            'end_reason': self.game.end_reason,
+            # ticks not played thanks to early termination
+            'saved_ticks': self.game.max_ticks - self.game.ticks if self.game.max_ticks is not None else 0,
+            'winners': self.game.get_winners(),
+            'tick_duration': {
+                'mean': sum(self.tick_durations) / len(self.tick_durations) if self.tick_durations else None,
+                **{f'p{point}': value for point, value in percentiles(self.tick_durations).items()},
+                'max': max(self.tick_durations, default=None),
+            },
+            'failed_clients': self.failed_clients,
+            'clients': {
+                client_id: {
+                    **time_bank.stats(),
+                    'skipped_frames': self.skipped_frames[client_id],
+                    'rtt': percentiles(self.rtts[client_id]) if self.rtts[client_id] else None,
+                    'cpu_time': self.all_clients[client_id].cpu_time(),
+                    'peak_rss': self.all_clients[client_id].peak_rss(),
+                }
+                for client_id, time_bank in self.time_banks.items()
+            },
+        }
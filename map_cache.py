@@ -0,0 +1,147 @@
+"""Compiled maps and their on-disk cache for batch runs.
+
+A compiled map is a validated map in a flat binary layout: a header, a record
+of six int64 per unit (id, team, spawn x and y, position x and y) and the
+serialized map config message. Games are created from it without parsing or
+validating the JSON again and share its action masks, see ``Game.from_compiled``.
+
+``MapCache`` keeps compiled maps in a directory under the sha256 of the map
+content, so every map is compiled once and later memory-mapped.
+
+    python map_cache.py maps/ map.json ...
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+from action_masks import ActionMasks
+from exceptions import InitializationError
+from game import Game
+
+
+MAGIC = b'RMAP'
+VERSION = 1
+# magic, version, width, height, team count, unit count, map config length
+HEADER = struct.Struct('<4sIqqqqq')
+UNIT = struct.Struct('<6q')
+
+
+def compile_map(config):
+    # validates the map config and returns its compiled form
+    game = Game.from_map_config(config)
+    map_config_json = json.dumps(game.map_config).encode()
+
+    units = [
+        UNIT.pack(unit.id, unit.team, *unit.spawn, *unit.position)
+        for unit in game.units.values()
+    ]
+    header = HEADER.pack(MAGIC, VERSION, game.width, game.height, game.team_count, len(units), len(map_config_json))
+
+    return b''.join([header, *units, map_config_json])
+
+
+class CompiledMap:
+    __slots__ = ('buffer', 'width', 'height', 'team_count', 'units', 'map_config', 'map_config_json', 'action_masks')
+
+    def __init__(self, buffer):
+        # buffer is bytes or a memory-mapped file
+        self.buffer = buffer
+        if len(buffer) < HEADER.size:
+            raise InitializationError('Compiled map is truncated')
+
+        magic, version, self.width, self.height, self.team_count, unit_count, config_length = \
+            HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise InitializationError('Not a compiled map of this version')
+
+        units_end = HEADER.size + unit_count * UNIT.size
+        if len(buffer) != units_end + config_length:
+            raise InitializationError('Compiled map is truncated')
+
+        self.units = tuple(UNIT.unpack_from(buffer, offset) for offset in range(HEADER.size, units_end, UNIT.size))
+        self.map_config_json = buffer[units_end:].decode()
+        self.map_config = json.loads(self.map_config_json)
+        # depends only on the map size, shared by the games
+        self.action_masks = ActionMasks(self.width, self.height)
+
+    def new_game(self, **options):
+        return Game.from_compiled(self, **options)
+
+
+def map_key(data):
+    # content hash of the map, format version included so old caches are not read
+    return hashlib.sha256(b'%s%d:%s' % (MAGIC, VERSION, data)).hexdigest()
+
+
+class MapCache:
+    def __init__(self, directory):
+        self.directory = directory
+        # compiled maps loaded by this process
+        self.maps = {}
+
+    def get(self, config):
+        # compiled map of a map config
+        data = json.dumps(config, sort_keys=True, separators=(',', ':')).encode()
+        return self.load(map_key(data), lambda: config)
+
+    def get_file(self, path):
+        # compiled map of a map file, hashed as is so a cache hit does not parse JSON
+        with open(path, 'rb') as f:
+            data = f.read()
+        return self.load(map_key(data), lambda: json.loads(data))
+
+    def load(self, key, get_config):
+        compiled_map = self.maps.get(key)
+        if compiled_map is not None:
+            return compiled_map
+
+        path = os.path.join(self.directory, key + '.map')
+        try:
+            compiled_map = read_compiled(path)
+        except (OSError, ValueError, InitializationError):
+            # missing or broken
+            compiled_map = CompiledMap(write_compiled(path, compile_map(get_config())))
+
+        self.maps[key] = compiled_map
+        return compiled_map
+
+
+def read_compiled(path):
+    with open(path, 'rb') as f:
+        return CompiledMap(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def write_compiled(path, data):
+    # written next to the target and renamed, so readers never see a partial file
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except:
+        os.unlink(tmp_path)
+        raise
+
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile maps into the cache')
+    parser.add_argument('directory', type=str, help='Cache directory')
+    parser.add_argument('maps', type=str, nargs='+', help='Map files')
+    args = parser.parse_args()
+
+    cache = MapCache(args.directory)
+    for path in args.maps:
+        compiled_map = cache.get_file(path)
+        print(f'{path}: {len(compiled_map.units)} units')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Socket and event loop settings of the TCP server.
+
+The ``low-latency`` profile disables Nagle's algorithm, coalesces everything
+sent to a client during a tick into one write, enlarges socket buffers, runs
+on uvloop when it is installed and measures round trip time of every client
+from the kernel (``TCP_INFO``, Linux only) to send it with the state.
+"""
+import asyncio
+import socket
+import struct
+import sys
+
+
+class NetworkProfile:
+    __slots__ = ('nodelay', 'coalesce', 'send_buffer', 'receive_buffer', 'uvloop', 'measure_rtt')
+
+    def __init__(self, nodelay=False, coalesce=False, send_buffer=None, receive_buffer=None,
+                 uvloop=False, measure_rtt=False):
+        self.nodelay = nodelay
+        self.coalesce = coalesce
+        self.send_buffer = send_buffer
+        self.receive_buffer = receive_buffer
+        self.uvloop = uvloop
+        self.measure_rtt = measure_rtt
+
+
+PROFILES = {
+    'default': NetworkProfile(),
+    'low-latency': NetworkProfile(nodelay=True, coalesce=True, send_buffer=1 << 20, receive_buffer=1 << 20,
+                                  uvloop=True, measure_rtt=True),
+}
+
+# struct tcp_info up to tcpi_rttvar, see linux/tcp.h
+TCP_INFO = struct.Struct('<8B24I')
+TCP_INFO_RTT = 23
+
+
+def configure_socket(sock, profile):
+    if sock is None:
+        return
+
+    if profile.nodelay:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if profile.send_buffer is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, profile.send_buffer)
+    if profile.receive_buffer is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, profile.receive_buffer)
+
+
+def socket_rtt(sock):
+    # smoothed round trip time in seconds measured by the kernel or None if unavailable
+    if sock is None or not hasattr(socket, 'TCP_INFO'):
+        return None
+
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, TCP_INFO.size)
+    except OSError:
+        return None
+    if len(info) < TCP_INFO.size:
+        return None
+
+    return TCP_INFO.unpack(info)[TCP_INFO_RTT] / 1e6
+
+
+def install_event_loop(profile):
+    # uvloop is optional, the stock loop is used without it
+    if not profile.uvloop:
+        return False
+
+    try:
+        import uvloop
+    except ImportError:
+        print('uvloop is not installed, using the default event loop', file=sys.stderr)
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -0,0 +1,10 @@
+class Observer:
+    # receives the log of every tick from GameLoop, must not block the loop
+    async def start(self):
+        pass
+
+    def on_tick(self, tick_log):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
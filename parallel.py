@@ -0,0 +1,594 @@
+"""Domain-decomposed simulation of very large maps.
+
+The map is split into strips of rows, tiles, and every tile owns the units
+standing in its rows. Tiles run in worker processes and a tick takes six
+rounds of messages between the master and the tiles:
+
+1. validate: the master routes commands by unit id to the tiles of their
+   units, which parse them, check the ranges and send claims of moves and
+   shots at other tiles to the tiles owning the target cells.
+2. resolve: tiles count claims of their cells and resolve move chains inside
+   the tile. A chain leaving the tile ends at an exit, the master stitches
+   exits of all the tiles into whole chains and cycles.
+3. move: tiles move their units, units crossing a border migrate through the
+   master, which also collects the border rows of every tile.
+4. spawn kills: tiles get migrants and a halo of the neighbours' border rows
+   (a unit kills from one cell away) and find units whose spawns are attacked.
+5. fire: killed units are removed and the shots of the survivors hit the
+   units at the cells of the tile.
+6. render: tiles render their units, actions and fire stats, the master
+   concatenates them into the tick log.
+
+Moves reach one cell and fire two, so apart from teleports all the traffic
+goes to the neighbouring tiles, and the master only handles commands, border
+traffic and deaths. The tick log holds the same units, actions and fire stats
+as the single process engine on the same commands, in tile order (a single
+tile keeps the order too). The master mirrors the game in a ``Game`` for the
+log and termination, positions of its units are pulled from the tiles only
+when they are read, see ``POSITION_ATTRIBUTES``. Only ``tick`` advances the game.
+"""
+import marshal
+import multiprocessing
+from collections import Counter, defaultdict
+from itertools import chain, repeat
+
+from actions import MOVE_RANGE, FIRE_RANGE
+from game import SPAWN_KILL_OFFSETS
+from utils import is_coordinate, inside_rectangle
+
+
+MOVE = 'move'
+TELEPORT = 'teleport'
+FIRE = 'fire'
+
+
+# properties of the actions.ACTION_CLASSES constructors: unit_id, then x and y
+ACTION_PROPERTIES = {
+    MOVE: 3,
+    TELEPORT: 1,
+    FIRE: 3,
+}
+
+# attributes of the mirrored game which read positions of the units
+POSITION_ATTRIBUTES = frozenset([
+    'units', 'occupancy', 'spawns', 'get_unit_by_id', 'get_legal_actions', 'render_legal_actions', 'to_checkpoint',
+])
+
+
+def strip_bounds(height, num_tiles):
+    num_tiles = max(1, min(num_tiles, height))
+    return [height * tile // num_tiles for tile in range(num_tiles + 1)]
+
+
+def row_tiles(bounds):
+    # tile of every row
+    return [tile for tile in range(len(bounds) - 1) for _ in range(bounds[tile], bounds[tile + 1])]
+
+
+class Tile:
+    """Units of the rows ``[y0, y1)``, they are addressed by rank, the index in the master."""
+
+    def __init__(self, index, bounds, width, ids, teams, spawns, positions):
+        self.index = index
+        self.y0 = bounds[index]
+        self.y1 = bounds[index + 1]
+        self.width = width
+        self.height = bounds[-1]
+        self.row_tiles = row_tiles(bounds)
+
+        # of all the units
+        self.ids = ids
+        self.teams = teams
+        self.spawns = spawns
+
+        # rank -> position and position -> rank of own units
+        self.positions = positions
+        self.occupancy = {position: rank for rank, position in positions.items()}
+        # spawn -> rank of alive units spawned inside the tile
+        self.spawn_index = {}
+
+        # state of the current tick: rank -> (kind, target) of the moves, (rank, target) of the fire
+        # actions, (target, rank) of the shots at the tile and ranks of the successful moves
+        self.moves = {}
+        self.several_moves = set()
+        self.fires = []
+        self.shots = []
+        self.resolved = {}
+        self.pending = {}
+        self.succeeded = []
+
+    def owns(self, position):
+        return self.y0 <= position[1] < self.y1
+
+    def add_spawns(self, ranks):
+        for rank in ranks:
+            self.spawn_index[self.spawns[rank]] = rank
+
+    def get_positions(self, data):
+        return self.positions
+
+    def parse(self, team, rank, command):
+        # checks of actions.create_action and Game.validate_commands which need no position,
+        # returns (kind, x, y) or None for invalid actions
+        if self.teams[rank] != team:
+            return None
+
+        # exactly the arguments of the constructor
+        try:
+            kind = command['action']
+            properties = command['properties']
+            if len(properties) != ACTION_PROPERTIES[kind] or not isinstance(properties['unit_id'], int):
+                return None
+            if kind == TELEPORT:
+                return kind, None, None
+            return kind, properties['x'], properties['y']
+        except (KeyError, TypeError):
+            return None
+
+    def validate(self, actions):
+        # actions are (team, rank, command) of own units in the order of the commands.
+        # Returns claims of moves and shots at other tiles by tile
+        self.moves = {}
+        self.several_moves = set()
+        self.fires = []
+        self.shots = []
+        shots = defaultdict(list)
+        for team, rank, command in actions:
+            action = self.parse(team, rank, command)
+            if action is None:
+                continue
+
+            kind, x, y = action
+            if kind == TELEPORT:
+                target = self.spawns[rank]
+            else:
+                # Move.validate and Fire.validate
+                if not is_coordinate((x, y)) or not inside_rectangle(self.width, self.height, x, y):
+                    continue
+
+                unit_x, unit_y = self.positions[rank]
+                reach = FIRE_RANGE if kind == FIRE else MOVE_RANGE
+                if abs(x - unit_x) > reach or abs(y - unit_y) > reach:
+                    continue
+
+                target = (x, y)
+                if kind == FIRE:
+                    self.fires.append((rank, target))
+                    tile = self.row_tiles[y]
+                    if tile == self.index:
+                        self.shots.append((target, rank))
+                    else:
+                        shots[tile].append((target, rank))
+                    continue
+
+            if rank in self.moves:
+                self.several_moves.add(rank)
+            self.moves[rank] = (kind, target)
+
+        claims = defaultdict(list)
+        for rank, (kind, target) in self.moves.items():
+            tile = self.row_tiles[target[1]]
+            if tile != self.index:
+                claims[tile].append((target, rank, rank in self.several_moves))
+
+        return dict(claims), dict(shots)
+
+    def resolve(self, data):
+        # claims are (target, rank, several moves) of other tiles' units at cells of the tile.
+        # Same rules as Game.resolve_move_conflicts, units moving out of the tile are exits
+        # resolved by the master. Returns outcomes of the claims, decided or continued by an exit
+        claims, shots = data
+        self.shots.extend(shots)
+
+        target_claims = Counter(target for kind, target in self.moves.values())
+        target_claims.update(target for target, rank, several in claims)
+
+        candidates = {}
+        # rank -> outcome, pending outcomes are the same as of the exit they lead to
+        resolved = self.resolved = {}
+        pending = self.pending = {}
+        for rank, (kind, target) in self.moves.items():
+            if not self.owns(target):
+                pending[rank] = rank
+            elif rank not in self.several_moves and target_claims[target] == 1:
+                candidates[rank] = target
+
+        for rank in candidates:
+            if rank in resolved or rank in pending:
+                continue
+
+            path = []
+            on_path = set()
+            current = rank
+            exit_rank = None
+            while True:
+                path.append(current)
+                on_path.add(current)
+
+                occupant = self.occupancy.get(candidates[current])
+                if occupant is None or occupant in on_path:
+                    result = True
+                    break
+                if occupant in resolved:
+                    result = resolved[occupant]
+                    break
+                if occupant in pending:
+                    exit_rank = pending[occupant]
+                    break
+                if occupant not in candidates:
+                    result = False
+                    break
+
+                current = occupant
+
+            for path_rank in path:
+                if exit_rank is None:
+                    resolved[path_rank] = result
+                else:
+                    pending[path_rank] = exit_rank
+
+        decided = []
+        continued = []
+        for target, rank, several in claims:
+            occupant = self.occupancy.get(target)
+            if several or target_claims[target] != 1:
+                decided.append((rank, False))
+            elif occupant is None:
+                decided.append((rank, True))
+            elif occupant in resolved:
+                decided.append((rank, resolved[occupant]))
+            elif occupant in pending:
+                continued.append((rank, pending[occupant]))
+            else:
+                decided.append((rank, False))
+
+        return decided, continued
+
+    def move(self, exit_results):
+        # exit_results are outcomes of own exits. Moves the units staying in the tile. Returns
+        # (rank, target) of the units leaving it by tile, units of the border rows and whether
+        # any unit changed its cell
+        resolved = self.resolved
+        pending = self.pending
+        # in the order of the moves, as Game.resolve_move_conflicts
+        succeeded = self.succeeded = [
+            rank for rank in self.moves
+            if resolved.get(rank) or (rank in pending and exit_results[pending[rank]])
+        ]
+        moved = any(self.moves[rank][1] != self.positions[rank] for rank in succeeded)
+
+        # all the cells are left before any is taken
+        for rank in succeeded:
+            del self.occupancy[self.positions[rank]]
+
+        migrants = defaultdict(list)
+        for rank in succeeded:
+            target = self.moves[rank][1]
+            if self.owns(target):
+                self.positions[rank] = target
+                self.occupancy[target] = rank
+            else:
+                # the master passes it to the new tile
+                del self.positions[rank]
+                migrants[self.row_tiles[target[1]]].append((rank, target))
+
+        border = {}
+        for y in {self.y0, self.y1 - 1}:
+            cells = ((x, y) for x in range(self.width))
+            border[y] = {cell: self.occupancy[cell] for cell in cells if cell in self.occupancy}
+
+        return dict(migrants), border, moved
+
+    def spawn_kills(self, data):
+        # migrants are (rank, position) of units entering the tile, halo is position -> rank
+        # of the rows next to the tile. Returns ranks of the units killed on their spawns
+        migrants, halo = data
+        for rank, position in migrants:
+            self.positions[rank] = position
+            self.occupancy[position] = rank
+
+        # cells of the tile and of the halo never overlap
+        occupant = self.occupancy.get
+        halo_occupant = halo.get
+        teams = self.teams
+        victims = []
+        for (spawn_x, spawn_y), rank in self.spawn_index.items():
+            team = teams[rank]
+            for dx, dy in SPAWN_KILL_OFFSETS:
+                cell = (spawn_x + dx, spawn_y + dy)
+                killer = occupant(cell)
+                if killer is None:
+                    killer = halo_occupant(cell)
+                if killer is not None and teams[killer] != team:
+                    victims.append(rank)
+                    break
+
+        return victims
+
+    def fire(self, data):
+        # removes own units killed on their spawns, dead is the set of all of them as dead units
+        # can't fire. Returns (target, rank) of the units shot at the cells of the tile
+        removed, forget, dead = data
+        for rank in removed:
+            del self.occupancy[self.positions.pop(rank)]
+        for rank in forget:
+            del self.spawn_index[self.spawns[rank]]
+        if dead:
+            self.fires = [(rank, target) for rank, target in self.fires if rank not in dead]
+            self.shots = [(target, rank) for target, rank in self.shots if rank not in dead]
+
+        # all shots are simultaneous as in Game.fire
+        occupancy = self.occupancy
+        victims = {target: occupancy[target] for target, rank in self.shots if target in occupancy}
+        for target, rank in victims.items():
+            del occupancy[target]
+            del self.positions[rank]
+
+        return list(victims.items())
+
+    def render(self, data):
+        # forgets spawns of the shot units, victims are the cells hit on the whole map.
+        # Returns units, moves, fire actions and fire stats of the tile for the tick log
+        forget, victims = data
+        for rank in forget:
+            del self.spawn_index[self.spawns[rank]]
+
+        ids = self.ids
+        units = [{'id': ids[rank], 'x': x, 'y': y} for rank, (x, y) in self.positions.items()]
+
+        # same as Action.render
+        moves = []
+        for rank in self.succeeded:
+            kind, (x, y) = self.moves[rank]
+            if kind == TELEPORT:
+                moves.append({'action': TELEPORT, 'properties': {'unit_id': ids[rank]}})
+            else:
+                moves.append({'action': MOVE, 'properties': {'unit_id': ids[rank], 'x': x, 'y': y}})
+
+        fires = []
+        fire_stats = {}
+        for rank, (x, y) in self.fires:
+            unit_id = ids[rank]
+            fires.append({'action': FIRE, 'properties': {'unit_id': unit_id, 'x': x, 'y': y}})
+
+            stats = fire_stats.setdefault(unit_id, {'unit_id': unit_id, 'shots': 0, 'hits': 0})
+            stats['shots'] += 1
+            if (x, y) in victims:
+                stats['hits'] += 1
+
+        return units, moves, fires, list(fire_stats.values())
+
+
+def worker(conn, tiles):
+    # messages hold only builtin types, marshal encodes them several times faster than pickle
+    while True:
+        command, data = marshal.loads(conn.recv_bytes())
+        if command == 'close':
+            conn.close()
+            break
+
+        conn.send_bytes(marshal.dumps([getattr(tile, command)(tile_data) for tile, tile_data in zip(tiles, data)]))
+
+
+class ParallelGame:
+    """Game ticked by tiles of rows, ``num_workers`` processes share the tiles.
+
+    With ``num_workers=0`` the tiles run in this process, which gives the same
+    results. Everything except ``tick`` is read from the mirrored game.
+    """
+
+    def __init__(self, game, num_tiles, num_workers=0):
+        self.game = game
+        self.bounds = strip_bounds(game.height, num_tiles)
+        self.num_tiles = len(self.bounds) - 1
+
+        # units of the mirrored game by rank, game.units drops the dead ones
+        self.ranked_units = list(game.units.values())
+        self.ranks = {unit.id: rank for rank, unit in enumerate(self.ranked_units)}
+        # tile of every alive unit, None when dead
+        tiles_of_rows = row_tiles(self.bounds)
+        self.owners = [tiles_of_rows[unit.position[1]] for unit in self.ranked_units]
+        self.spawn_tiles = [tiles_of_rows[unit.spawn[1]] for unit in self.ranked_units]
+        # alive units of every team, for the remaining teams
+        self.team_sizes = Counter(unit.team for unit in self.ranked_units)
+        # positions of the mirrored units are those of the tiles
+        self.synced = True
+
+        ids = [unit.id for unit in self.ranked_units]
+        teams = [unit.team for unit in self.ranked_units]
+        spawns = [unit.spawn for unit in self.ranked_units]
+        tiles = []
+        for index in range(self.num_tiles):
+            positions = {rank: unit.position for rank, unit in enumerate(self.ranked_units) if self.owners[rank] == index}
+            tile = Tile(index, self.bounds, game.width, ids, teams, spawns, positions)
+            tile.add_spawns(rank for rank in range(len(self.ranked_units)) if self.spawn_tiles[rank] == index)
+            tiles.append(tile)
+
+        self.num_workers = min(num_workers, self.num_tiles)
+        self.tiles = tiles if not self.num_workers else None
+        self.connections = []
+        self.processes = []
+        # tiles of every worker are consecutive
+        self.worker_bounds = [0]
+        if self.num_workers:
+            context = multiprocessing.get_context('spawn')
+            for worker_id in range(self.num_workers):
+                worker_tiles = self.num_tiles // self.num_workers + (worker_id < self.num_tiles % self.num_workers)
+                start = self.worker_bounds[-1]
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(target=worker, args=(child_conn, tiles[start:start + worker_tiles]),
+                                          daemon=True)
+                process.start()
+                child_conn.close()
+
+                self.connections.append(parent_conn)
+                self.processes.append(process)
+                self.worker_bounds.append(start + worker_tiles)
+
+    def __getattr__(self, name):
+        if name in POSITION_ATTRIBUTES and not self.synced:
+            self.sync()
+        return getattr(self.game, name)
+
+    def call(self, command, data):
+        # runs the command on every tile with its data, returns results in tile order
+        if not self.num_workers:
+            return [getattr(tile, command)(tile_data) for tile, tile_data in zip(self.tiles, data)]
+
+        for conn, start, end in zip(self.connections, self.worker_bounds, self.worker_bounds[1:]):
+            conn.send_bytes(marshal.dumps((command, data[start:end])))
+        return [result for conn in self.connections for result in marshal.loads(conn.recv_bytes())]
+
+    def sync(self):
+        # copies positions of the units from the tiles into the mirrored game
+        game = self.game
+        ranked_units = self.ranked_units
+        for positions in self.call('get_positions', [None] * self.num_tiles):
+            for rank, position in positions.items():
+                ranked_units[rank].position = position
+
+        game.occupancy = {unit.position: unit for unit in game.units.values()}
+        game.spawns = {unit.spawn: unit for unit in game.units.values()}
+        self.synced = True
+
+    def tick(self, team_commands):
+        game = self.game
+        ranks = self.ranks
+        owners = self.owners
+        num_tiles = self.num_tiles
+
+        # commands go to the tiles of their units and are parsed there, in the order of
+        # Game.validate_commands
+        routed = [[] for _ in range(num_tiles)]
+        for team, command in team_commands.items():
+            for action in command:
+                try:
+                    rank = ranks[action['properties']['unit_id']]
+                except (KeyError, TypeError):
+                    continue
+
+                tile = owners[rank]
+                if tile is not None:
+                    routed[tile].append((team, rank, action))
+
+        # 1. validation, claims and shots between tiles
+        claims = [[] for _ in range(num_tiles)]
+        shots = [[] for _ in range(num_tiles)]
+        for tile_claims, tile_shots in self.call('validate', routed):
+            for tile, tile_claim in tile_claims.items():
+                claims[tile].extend(tile_claim)
+            for tile, tile_shot in tile_shots.items():
+                shots[tile].extend(tile_shot)
+
+        # 2. chains inside the tiles, then stitched across the borders
+        decided = {}
+        continued = {}
+        for tile_decided, tile_continued in self.call('resolve', list(zip(claims, shots))):
+            decided.update(tile_decided)
+            continued.update(tile_continued)
+
+        exit_results = {}
+        for exit_rank in chain(decided, continued):
+            path = []
+            on_path = set()
+            current = exit_rank
+            while True:
+                if current in exit_results:
+                    result = exit_results[current]
+                    break
+                if current in on_path:
+                    # cycle through several tiles
+                    result = True
+                    break
+                path.append(current)
+                on_path.add(current)
+                if current in decided:
+                    result = decided[current]
+                    break
+                current = continued[current]
+
+            for path_rank in path:
+                exit_results[path_rank] = result
+
+        tile_exit_results = [{} for _ in range(num_tiles)]
+        for exit_rank, result in exit_results.items():
+            tile_exit_results[owners[exit_rank]][exit_rank] = result
+
+        # 3. moves and migration
+        migrants = [[] for _ in range(num_tiles)]
+        border = {}
+        moved = False
+        for tile_migrants, tile_border, tile_moved in self.call('move', tile_exit_results):
+            for tile, tile_migrant in tile_migrants.items():
+                migrants[tile].extend(tile_migrant)
+            border.update(tile_border)
+            moved = moved or tile_moved
+
+        for tile, tile_migrants in enumerate(migrants):
+            for rank, target in tile_migrants:
+                owners[rank] = tile
+                if target[1] in border:
+                    border[target[1]][target] = rank
+
+        # 4. spawn kills with the halo of the neighbouring rows
+        halos = []
+        for tile in range(num_tiles):
+            halo = {}
+            for y in (self.bounds[tile] - 1, self.bounds[tile + 1]):
+                halo.update(border.get(y, ()))
+            halos.append(halo)
+
+        dead = {rank for victims in self.call('spawn_kills', list(zip(migrants, halos))) for rank in victims}
+
+        # 5. fire of the survivors
+        removed = [[] for _ in range(num_tiles)]
+        forget = [[] for _ in range(num_tiles)]
+        for rank in dead:
+            removed[owners[rank]].append(rank)
+            forget[self.spawn_tiles[rank]].append(rank)
+            owners[rank] = None
+
+        victims = set()
+        killed = list(dead)
+        forget_shot = [[] for _ in range(num_tiles)]
+        for tile_victims in self.call('fire', list(zip(removed, forget, repeat(dead)))):
+            for target, rank in tile_victims:
+                victims.add(target)
+                killed.append(rank)
+                owners[rank] = None
+                forget_shot[self.spawn_tiles[rank]].append(rank)
+
+        for rank in killed:
+            unit = game.units.pop(self.ranked_units[rank].id)
+            self.team_sizes[unit.team] -= 1
+
+        # 6. the log of the tiles
+        units = []
+        moves = []
+        fires = []
+        fire_stats = []
+        rendered = self.call('render', list(zip(forget_shot, repeat(victims))))
+        for tile_units, tile_moves, tile_fires, tile_stats in rendered:
+            units += tile_units
+            moves += tile_moves
+            fires += tile_fires
+            fire_stats += tile_stats
+
+        self.synced = False
+        game.remaining_teams = {team for team, size in self.team_sizes.items() if size}
+        game.end_tick({'units': units, 'actions': moves + fires, 'fire_stats': fire_stats}, moved or bool(killed))
+
+    def close(self):
+        for conn in self.connections:
+            conn.send_bytes(marshal.dumps(('close', None)))
+        for process in self.processes:
+            process.join()
+
+        self.connections.clear()
+        self.processes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
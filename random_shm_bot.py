@@ -0,0 +1,42 @@
+import json
+import sys
+
+from random_bot import Unit, random_move
+from shared_state import connect
+
+
+def main():
+    # same as random_bot but reads game state from the shared memory transport
+    config, reader = connect()
+
+    my_team_id = config['my_team_id']
+    map_width = config['map_width']
+    map_height = config['map_height']
+
+    units = {unit['id']: Unit(**unit) for unit in config['units']}
+
+    while True:
+        state = reader.wait()
+
+        alive = set()
+        for unit_id, x, y in state.iter_units():
+            units[unit_id].update(x, y)
+            alive.add(unit_id)
+
+        command = []
+        for unit_id in alive:
+            unit = units[unit_id]
+            if unit.team == my_team_id:
+                move_x, move_y = random_move(unit, map_width, map_height)
+                action = {
+                    'action': 'move',
+                    'properties': {'unit_id': unit.id, 'x': move_x, 'y': move_y}
+                }
+                command.append(action)
+
+        sys.stdout.write(json.dumps(command) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
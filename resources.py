@@ -0,0 +1,151 @@
+"""CPU time accounting and resource limits of strategy processes (Linux).
+
+CPU time and peak memory are read from ``/proc`` for the whole process tree
+of a strategy, since strategies are started through the shell and may spawn
+helpers. Limits are applied with rlimits in the child before it starts:
+``RLIMIT_AS`` caps memory and ``RLIMIT_CPU`` the total CPU time of every
+process (the kernel kills it when the limit is hit). Optionally every
+strategy is pinned to its own core.
+"""
+import os
+import resource
+import time
+
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+# fields of /proc/<pid>/stat counted after the command name
+STAT_PPID = 1
+STAT_UTIME = 11
+STAT_CSTIME = 14
+# seconds between searches for new processes in the tree of a strategy
+TREE_RESCAN_INTERVAL = 1.0
+
+
+class ResourceLimits:
+    __slots__ = ('memory', 'cpu_time', 'cpu')
+
+    def __init__(self, memory=None, cpu_time=None, cpu=None):
+        # bytes of address space, total CPU seconds and core to pin the strategy to
+        self.memory = memory
+        self.cpu_time = cpu_time
+        self.cpu = cpu
+
+    def __bool__(self):
+        return self.memory is not None or self.cpu_time is not None or self.cpu is not None
+
+    def apply(self):
+        # runs in the child between fork and exec
+        if self.memory is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (self.memory, self.memory))
+        if self.cpu_time is not None:
+            seconds = max(1, int(self.cpu_time + 0.5))
+            # SIGXCPU at the soft limit, SIGKILL a second later
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if self.cpu is not None:
+            os.sched_setaffinity(0, {self.cpu})
+
+
+def strategy_limits(count, memory=None, cpu_time=None, pin_cpus=False):
+    # limits of every strategy, pinned strategies get cores round robin
+    cpus = sorted(os.sched_getaffinity(0)) if pin_cpus else [None]
+    return [ResourceLimits(memory, cpu_time, cpus[i % len(cpus)]) for i in range(count)]
+
+
+def read_stat(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        # command name is in parentheses and may contain spaces
+        return f.read().rpartition(')')[2].split()
+
+
+def process_tree(pid):
+    # pid and all its descendants, only pid when /proc is not available
+    try:
+        if os.path.exists(f'/proc/{pid}/task/{pid}/children'):
+            return walk_children(pid)
+        return scan_children(pid)
+    except OSError:
+        return [pid]
+
+
+def walk_children(pid):
+    # child lists of all threads, only the processes of the tree are read
+    tree = [pid]
+    for parent in tree:
+        try:
+            for task in os.listdir(f'/proc/{parent}/task'):
+                with open(f'/proc/{parent}/task/{task}/children') as f:
+                    tree.extend(map(int, f.read().split()))
+        except OSError:
+            # exited meanwhile
+            continue
+    return tree
+
+
+def scan_children(pid):
+    # kernels without child lists, parents of all processes are read
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                ppid = int(read_stat(entry)[STAT_PPID])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+
+    tree = [pid]
+    for parent in tree:
+        tree.extend(children.get(parent, ()))
+    return tree
+
+
+class ProcessUsage:
+    """CPU time and peak resident memory of a process tree.
+
+    Values of the last successful sample are kept, so they are still reported
+    after the strategy exits or when ``/proc`` is not available. The tree is
+    found again only every ``TREE_RESCAN_INTERVAL`` seconds, a sample reads
+    just the processes of the tree.
+    """
+
+    __slots__ = ('pid', 'cpu_time', 'peak_rss', 'tree', 'scanned')
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu_time = 0.0
+        self.peak_rss = 0
+        self.tree = None
+        self.scanned = 0.0
+
+    def sample(self):
+        # returns CPU seconds used by the tree so far
+        now = time.monotonic()
+        if self.tree is None or now - self.scanned >= TREE_RESCAN_INTERVAL:
+            self.tree = process_tree(self.pid)
+            self.scanned = now
+
+        cpu_ticks = 0
+        rss = 0
+        found = False
+        for pid in self.tree:
+            try:
+                # user and system time of the process and of its waited for children
+                cpu_ticks += sum(map(int, read_stat(pid)[STAT_UTIME:STAT_CSTIME + 1]))
+                rss += read_peak_rss(pid)
+            except (OSError, IndexError, ValueError):
+                continue
+            found = True
+
+        if found:
+            # exited helpers leave the tree, the total never goes back
+            self.cpu_time = max(self.cpu_time, cpu_ticks / CLOCK_TICKS)
+            self.peak_rss = max(self.peak_rss, rss)
+
+        return self.cpu_time
+
+
+def read_peak_rss(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) * 1024
+    return 0
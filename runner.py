@@ -1,51 +1,94 @@
 import argparse
-from game import Game
+from checkpoint import CheckpointWriter, CHECKPOINT_INTERVAL, has_checkpoint, load_checkpoint
+from game import Game, MAX_TICKS, STALEMATE_TICKS
 from game_loop import GameLoop
-from clients import ProcessClient, TCPClient
+from clients import ProcessClient, SharedMemoryClient, TCPClient, HIGH_WATER_MARK, SKIP_FRAME, BACKPRESSURE_POLICIES
+from map_cache import MapCache
+from network import PROFILES, install_event_loop
+from parallel import ParallelGame
+from resources import strategy_limits
+from shared_state import SharedStateWriter
+from spectators import SpectatorServer
+from time_bank import TICK_TIMEOUT, TIME_BANK
+from viewer import TerminalViewer, FPS
 import asyncio
+import itertools
 import json
 import sys
 
 
-async def get_process_clients(strategies):
+# pending connections, all players of a big match may connect at once
+BACKLOG = 1024
+# longest command line accepted from a TCP client
+STREAM_LIMIT = 1 << 20
+
+
+async def get_process_clients(strategies, shared_state=None, limits=()):
     processes = []
-    for strategy in strategies:
+    for strategy, process_limits in itertools.zip_longest(strategies, limits):
         process = asyncio.create_subprocess_shell(strategy,
                                                   stdin=asyncio.subprocess.PIPE,
                                                   stdout=asyncio.subprocess.PIPE,
-                                                  stderr=asyncio.subprocess.DEVNULL)
+                                                  stderr=asyncio.subprocess.DEVNULL,
+                                                  preexec_fn=process_limits.apply if process_limits else None)
         processes.append(process)
 
     processes = await asyncio.gather(*processes)
-    clients = [ProcessClient(process) for process in processes]
+    if shared_state is not None:
+        clients = [SharedMemoryClient(process, shared_state) for process in processes]
+    else:
+        clients = [ProcessClient(process) for process in processes]
     return clients
 
 
+async def start_spectators(observers):
+    # spectators may connect while the players are still connecting
+    for observer in observers:
+        if isinstance(observer, SpectatorServer):
+            await observer.start()
+
+
+async def stop_spectators(observers):
+    for observer in observers:
+        if isinstance(observer, SpectatorServer):
+            await observer.stop()
+
+
 class Server:
-    def __init__(self, game, host, port):
+    def __init__(self, game, host, port, network_profile=PROFILES['default'], **loop_options):
         self.clients = []
-        self.need_clients = len(game.remaining_teams)
+        self.need_clients = game.team_count
         self.game = game
         self.host = host
         self.port = port
+        self.network_profile = network_profile
+        self.loop_options = {'report_rtt': network_profile.measure_rtt, **loop_options}
         self.server = None
+        self.game_loop = None
 
     async def run(self):
-        self.server = await asyncio.start_server(self.on_connect, self.host, self.port)
-
-        async with self.server:
-            try:
-                await self.server.serve_forever()
-            except asyncio.exceptions.CancelledError:
-                pass
+        observers = self.loop_options.get('observers', ())
+        await start_spectators(observers)
+        self.server = await asyncio.start_server(self.on_connect, self.host, self.port,
+                                                 backlog=BACKLOG, limit=STREAM_LIMIT)
+
+        try:
+            async with self.server:
+                try:
+                    await self.server.serve_forever()
+                except asyncio.exceptions.CancelledError:
+                    pass
+        finally:
+            # the game may have never started
+            await stop_spectators(observers)
 
     async def on_connect(self, reader, writer):
         if len(self.clients) < self.need_clients:
-            self.clients.append(TCPClient(reader, writer))
+            self.clients.append(TCPClient(reader, writer, self.network_profile))
 
             if len(self.clients) == self.need_clients:
-                game_loop = GameLoop(self.game, self.clients)
-                await game_loop.play()
+                self.game_loop = GameLoop(self.game, self.clients, **self.loop_options)
+                await self.game_loop.play()
 
                 self.server.close()
         else:
@@ -53,21 +96,67 @@ class Server:
 
 
 def run_server(game, args):
-    server = Server(game, args.host, args.port)
+    network_profile = PROFILES[args.network_profile]
+    install_event_loop(network_profile)
+    server = Server(game, args.host, args.port, network_profile, **get_loop_options(args, game))
 
     loop = asyncio.get_event_loop()
     loop.run_until_complete(server.run())
 
+    if server.game_loop is not None:
+        print_summary(server.game_loop)
+
 
 def run_local(game, args):
-    if len(args.strategies) != len(game.remaining_teams):
+    if len(args.strategies) != game.team_count:
         sys.exit(1)
 
-    loop = asyncio.get_event_loop()
-    clients = loop.run_until_complete(get_process_clients(args.strategies))
+    shared_state = SharedStateWriter(len(game.units)) if args.transport == 'shm' else None
+    loop_options = get_loop_options(args, game)
 
-    game_loop = GameLoop(game, clients)
-    loop.run_until_complete(game_loop.play())
+    loop = asyncio.get_event_loop()
+    try:
+        loop.run_until_complete(start_spectators(loop_options['observers']))
+        memory_limit = args.memory_limit << 20 if args.memory_limit is not None else None
+        limits = strategy_limits(game.team_count, memory_limit, args.cpu_limit, args.pin_cpus)
+        clients = loop.run_until_complete(get_process_clients(args.strategies, shared_state, limits))
+
+        game_loop = GameLoop(game, clients, shared_state=shared_state, cpu_accounting=args.cpu_accounting,
+                             **loop_options)
+        loop.run_until_complete(game_loop.play())
+    finally:
+        loop.run_until_complete(stop_spectators(loop_options['observers']))
+        if shared_state is not None:
+            shared_state.close()
+
+    print_summary(game_loop)
+
+
+def get_loop_options(args, game):
+    observers = []
+    if args.view:
+        observers.append(TerminalViewer(game.map_config, args.fps))
+    if args.spectator_port is not None:
+        observers.append(SpectatorServer(game, args.spectator_host, args.spectator_port))
+    if args.checkpoint_dir is not None:
+        observers.append(CheckpointWriter(game, args.checkpoint_dir, args.checkpoint_interval))
+    if args.columnar is not None:
+        # numpy is needed only for the columnar logs
+        from columnar import ColumnarSink
+        observers.append(ColumnarSink(game, args.columnar))
+
+    return {
+        'tick_timeout': args.tick_timeout,
+        'time_bank': args.time_bank,
+        'high_water_mark': args.high_water_mark,
+        'backpressure_policy': args.backpressure,
+        'observers': observers,
+        'legal_actions': args.legal_actions,
+    }
+
+
+def print_summary(game_loop):
+    print(json.dumps(game_loop.summary(), indent=2), file=sys.stderr)
 
 
 def parsing():
@@ -76,16 +165,55 @@ def parsing():
 
     default_parser = argparse.ArgumentParser()
     default_parser.add_argument('--map', type=argparse.FileType(mode='r'), help='Path to the map file', required=True)
+    default_parser.add_argument('--map-cache', type=str,
+                                help='Directory of compiled maps, the map is compiled there on the first run')
+    default_parser.add_argument('--max-ticks', type=int, default=MAX_TICKS)
+    default_parser.add_argument('--stalemate-ticks', type=int, default=STALEMATE_TICKS,
+                                help='Ticks without kills and moves after which the game ends')
+    default_parser.add_argument('--tick-timeout', type=float, default=TICK_TIMEOUT,
+                                help='Seconds a client may think every tick without drawing from its time bank')
+    default_parser.add_argument('--time-bank', type=float, default=TIME_BANK,
+                                help='Total seconds a client may overrun the tick timeout during the game')
+    default_parser.add_argument('--legal-actions', action='store_true',
+                                help='Send legal move and fire masks of the units with the state')
+    default_parser.add_argument('--view', action='store_true', help='Show the game in the terminal')
+    default_parser.add_argument('--fps', type=float, default=FPS, help='Maximal redraws per second of the view')
+    default_parser.add_argument('--spectator-host', type=str, default='127.0.0.1')
+    default_parser.add_argument('--spectator-port', type=int, help='Port to stream the game to spectators')
+    default_parser.add_argument('--checkpoint-dir', type=str, help='Directory for periodic game checkpoints')
+    default_parser.add_argument('--checkpoint-interval', type=int, default=CHECKPOINT_INTERVAL,
+                                help='Ticks between checkpoints')
+    default_parser.add_argument('--resume', action='store_true',
+                                help='Continue the game from the latest checkpoint in --checkpoint-dir if there is one')
+    default_parser.add_argument('--columnar', type=str, help='Also save the game log in columnar .npz format')
+    default_parser.add_argument('--tiles', type=int, default=0,
+                                help='Simulate the map in that many strips of rows, each in a worker process')
+    default_parser.add_argument('--high-water-mark', type=int, default=HIGH_WATER_MARK,
+                                help='Bytes queued to a client above which backpressure policy applies')
+    default_parser.add_argument('--backpressure', choices=BACKPRESSURE_POLICIES, default=SKIP_FRAME,
+                                help='What to do with a client that does not keep up with the game state')
 
     subparsers = parser.add_subparsers(dest='mode', required=True)
     local_parser = subparsers.add_parser('local', parents=[default_parser], add_help=False)
     local_parser.add_argument('strategies', type=str,
                               help='Paths of strategies',
                               nargs='+')
+    local_parser.add_argument('--transport', choices=('pipe', 'shm'), default='pipe',
+                              help='How game state is passed to strategies, '
+                                   'shm requires strategies built on shared_state.SharedStateReader')
+    local_parser.add_argument('--cpu-accounting', action='store_true',
+                              help='Charge time banks with CPU time of the strategies instead of wall time')
+    local_parser.add_argument('--cpu-limit', type=float,
+                              help='Total CPU seconds of every strategy process, it is killed above that')
+    local_parser.add_argument('--memory-limit', type=int, help='Address space of every strategy process in MiB')
+    local_parser.add_argument('--pin-cpus', action='store_true', help='Run every strategy on its own core')
 
     server_parser = subparsers.add_parser('server', parents=[default_parser], add_help=False)
     server_parser.add_argument('--host', type=str, required=True)
     server_parser.add_argument('--port', type=str, required=True)
+    server_parser.add_argument('--network-profile', choices=PROFILES, default='default',
+                               help='low-latency: TCP_NODELAY, coalesced writes, bigger buffers, '
+                                    'uvloop if installed and round trip times in the state')
 
     return parser.parse_args()
 
@@ -94,10 +222,23 @@ if __name__ == '__main__':
     args = parsing()
 
     # open map config and create a game to get count of teams
-    map_config = json.load(args.map)
-    game = Game.from_map_config(map_config)
-
-    if args.mode == 'server':
-        run_server(game, args)
+    if args.resume and args.checkpoint_dir is not None and has_checkpoint(args.checkpoint_dir):
+        game = load_checkpoint(args.checkpoint_dir)
+    elif args.map_cache is not None:
+        compiled_map = MapCache(args.map_cache).get_file(args.map.name)
+        game = compiled_map.new_game(max_ticks=args.max_ticks, stalemate_ticks=args.stalemate_ticks)
     else:
-        run_local(game, args)
+        map_config = json.load(args.map)
+        game = Game.from_map_config(map_config, max_ticks=args.max_ticks, stalemate_ticks=args.stalemate_ticks)
+
+    if args.tiles:
+        game = ParallelGame(game, args.tiles, args.tiles)
+
+    try:
+        if args.mode == 'server':
+            run_server(game, args)
+        else:
+            run_local(game, args)
+    finally:
+        if args.tiles:
+            game.close()
@@ -0,0 +1,150 @@
+"""Shared memory transport of the game state for local strategies.
+
+State snapshots are written into a ring buffer in ``multiprocessing.shared_memory``
+with a fixed binary layout (all little endian)::
+
+    header  magic(4s) version(I) slot_count(I) slot_size(I) latest_seq(Q)
+    slot    seq(Q) tick(I) unit_count(I) then unit_count records of id(i) x(i) y(i)
+
+After a snapshot is published the server writes its sequence number as a short
+line (``b'<seq>\\n'``) to the strategy's stdin, commands still go back through
+stdout as JSON. ``SharedStateReader`` is the strategy side of the transport.
+"""
+from multiprocessing import shared_memory
+import json
+import struct
+import sys
+
+
+MAGIC = b'RNSS'
+VERSION = 1
+DEFAULT_SLOTS = 4
+
+HEADER = struct.Struct('<4sIIIQ')
+SLOT_HEADER = struct.Struct('<QII')
+UNIT = struct.Struct('<iii')
+
+LATEST_SEQ_OFFSET = HEADER.size - 8
+
+
+def slot_size_for(unit_count):
+    return SLOT_HEADER.size + UNIT.size * unit_count
+
+
+class SharedStateWriter:
+    def __init__(self, unit_count, slot_count=DEFAULT_SLOTS):
+        self.slot_count = slot_count
+        self.slot_size = slot_size_for(unit_count)
+        self.memory = shared_memory.SharedMemory(create=True, size=HEADER.size + self.slot_count * self.slot_size)
+        self.seq = 0
+        self.notification = b''
+
+        HEADER.pack_into(self.memory.buf, 0, MAGIC, VERSION, self.slot_count, self.slot_size, 0)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def describe(self):
+        # what strategy needs to attach, sent within the map config
+        return {'name': self.name, 'slots': self.slot_count, 'slot_size': self.slot_size}
+
+    def publish(self, tick, units):
+        self.seq += 1
+        offset = HEADER.size + (self.seq % self.slot_count) * self.slot_size
+        buf = self.memory.buf
+
+        # the slot seq is written last so a reader never sees a half written slot as current
+        SLOT_HEADER.pack_into(buf, offset, 0, tick, 0)
+        unit_offset = offset + SLOT_HEADER.size
+        count = 0
+        for unit in units:
+            UNIT.pack_into(buf, unit_offset, unit.id, unit.position[0], unit.position[1])
+            unit_offset += UNIT.size
+            count += 1
+
+        SLOT_HEADER.pack_into(buf, offset, self.seq, tick, count)
+        struct.pack_into('<Q', buf, LATEST_SEQ_OFFSET, self.seq)
+
+        self.notification = b'%d\n' % self.seq
+        return self.seq
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+class StateView:
+    """Snapshot read straight from shared memory.
+
+    ``units`` is a flat ``memoryview`` of int32 ``[id, x, y, id, x, y, ...]``
+    (``numpy.frombuffer(view.units, dtype='<i4').reshape(-1, 3)`` for an array).
+    The view is valid until the server wraps around the ring, i.e. for
+    ``slot_count - 1`` ticks.
+    """
+
+    __slots__ = ('seq', 'tick', 'unit_count', 'units')
+
+    def __init__(self, seq, tick, unit_count, units):
+        self.seq = seq
+        self.tick = tick
+        self.unit_count = unit_count
+        self.units = units
+
+    def iter_units(self):
+        units = self.units
+        for i in range(0, 3 * self.unit_count, 3):
+            yield units[i], units[i + 1], units[i + 2]
+
+
+class SharedStateReader:
+    def __init__(self, description, stream=None):
+        self.memory = attach(description['name'])
+        self.stream = stream if stream is not None else sys.stdin.buffer
+
+        magic, version, self.slot_count, self.slot_size, _ = HEADER.unpack_from(self.memory.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Unsupported shared state layout')
+
+    def read(self, seq):
+        offset = HEADER.size + (seq % self.slot_count) * self.slot_size
+        slot_seq, tick, unit_count = SLOT_HEADER.unpack_from(self.memory.buf, offset)
+        if slot_seq != seq:
+            raise ValueError(f'Snapshot {seq} was overwritten')
+
+        start = offset + SLOT_HEADER.size
+        units = self.memory.buf[start:start + UNIT.size * unit_count].cast('i')
+        return StateView(seq, tick, unit_count, units)
+
+    def wait(self):
+        # blocks until the server announces the next snapshot
+        line = self.stream.readline()
+        if not line:
+            raise EOFError('Server closed the stream')
+        return self.read(int(line))
+
+    def latest(self):
+        seq, = struct.unpack_from('<Q', self.memory.buf, LATEST_SEQ_OFFSET)
+        return self.read(seq)
+
+    def close(self):
+        self.memory.close()
+
+
+def attach(name):
+    # the segment is owned by the server, the strategy must not unlink it on exit
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+
+        memory = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        return memory
+
+
+def connect(stream=None):
+    # strategy side handshake: reads map config and attaches to the announced state ring
+    stream = stream if stream is not None else sys.stdin.buffer
+    config = json.loads(stream.readline())
+    return config, SharedStateReader(config['shared_state'], stream)
@@ -0,0 +1,141 @@
+"""Read-only spectator endpoint streaming the game to any number of viewers.
+
+A spectator connects and may send one JSON line with options within
+``HANDSHAKE_TIMEOUT`` seconds:
+
+* ``every`` - send only every n-th tick (full frames only)
+* ``delta`` - send only units that changed since the previous tick
+
+Then it receives the map config line followed by one JSON line per frame.
+Spectators may connect as soon as the server starts, before every player has
+connected; they get the map config right away and frames once the game runs.
+Full frames are ``{"tick", "units", "actions", "fire_stats", "key": true}``,
+delta frames carry ``units`` that moved and ``removed`` ids of units that died
+instead; a delta spectator always starts with (and after skipped frames gets)
+a full frame.
+
+Every frame is encoded once for all spectators. Writes never wait: frames to a
+spectator with more than ``high_water_mark`` bytes queued are skipped and after
+``max_skipped`` frames in a row it is disconnected.
+"""
+import asyncio
+import json
+
+from observers import Observer
+
+
+HANDSHAKE_TIMEOUT = 1.0
+HIGH_WATER_MARK = 1 << 20
+MAX_SKIPPED = 100
+
+
+class Spectator:
+    __slots__ = ('writer', 'every', 'delta', 'need_key_frame', 'skipped', 'sent')
+
+    def __init__(self, writer, every=1, delta=False):
+        self.writer = writer
+        self.every = every
+        self.delta = delta
+        self.need_key_frame = True
+        self.skipped = 0
+        self.sent = 0
+
+
+class SpectatorServer(Observer):
+    def __init__(self, game, host, port, high_water_mark=HIGH_WATER_MARK, max_skipped=MAX_SKIPPED):
+        self.game = game
+        self.host = host
+        self.port = port
+        self.high_water_mark = high_water_mark
+        self.max_skipped = max_skipped
+
+        self.server = None
+        self.spectators = []
+        self.dropped = 0
+        # unit id -> position of the previous tick for delta frames
+        self.positions = {}
+
+    async def start(self):
+        # the runner starts listening before the players connect, the game loop starts it again
+        if self.server is None:
+            self.server = await asyncio.start_server(self.on_connect, self.host, self.port)
+        self.positions = {unit.id: unit.position for unit in self.game.units.values()}
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+
+        for spectator in self.spectators:
+            spectator.writer.close()
+        self.spectators.clear()
+
+    async def on_connect(self, reader, writer):
+        try:
+            options = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+            options = json.loads(options) if options.strip() else {}
+            spectator = Spectator(writer, max(1, int(options.get('every', 1))), bool(options.get('delta', False)))
+        except asyncio.TimeoutError:
+            spectator = Spectator(writer)
+        except (ValueError, TypeError, AttributeError):
+            writer.close()
+            return
+
+        writer.write((json.dumps(self.game.map_config) + '\n').encode())
+        self.spectators.append(spectator)
+
+    def on_tick(self, tick_log):
+        tick = self.game.ticks
+        positions = {unit['id']: (unit['x'], unit['y']) for unit in tick_log['units']}
+        previous_positions = self.positions
+        self.positions = positions
+
+        frames = {}
+
+        def get_frame(kind):
+            # every kind of frame is encoded at most once per tick
+            if kind not in frames:
+                if kind == 'delta':
+                    frame = {
+                        'tick': tick,
+                        'units': [
+                            unit for unit in tick_log['units']
+                            if previous_positions.get(unit['id']) != (unit['x'], unit['y'])
+                        ],
+                        'removed': [unit_id for unit_id in previous_positions if unit_id not in positions],
+                        'actions': tick_log['actions'],
+                        'fire_stats': tick_log.get('fire_stats', []),
+                    }
+                else:
+                    frame = {'tick': tick, **tick_log, 'key': True}
+                frames[kind] = (json.dumps(frame) + '\n').encode()
+
+            return frames[kind]
+
+        for spectator in list(self.spectators):
+            if not spectator.delta and tick % spectator.every:
+                continue
+
+            transport = spectator.writer.transport
+            if transport.is_closing():
+                self.remove(spectator)
+                continue
+
+            if transport.get_write_buffer_size() > self.high_water_mark:
+                spectator.skipped += 1
+                spectator.need_key_frame = True
+                if spectator.skipped > self.max_skipped:
+                    self.remove(spectator)
+                continue
+
+            frame = get_frame('delta' if spectator.delta and not spectator.need_key_frame else 'full')
+
+            spectator.writer.write(frame)
+            spectator.need_key_frame = False
+            spectator.skipped = 0
+            spectator.sent += 1
+
+    def remove(self, spectator):
+        self.spectators.remove(spectator)
+        spectator.writer.close()
+        self.dropped += 1
@@ -13,6 +13,8 @@ class TCPClient:
 
         # connect to server
         self.conn = socket.create_connection((host, port))
+        # commands are tiny, do not let Nagle's algorithm hold them back
+        self.conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.buffer = b''
 
         atexit.register(self.on_exit)
@@ -23,17 +25,19 @@ class TCPClient:
         self.process.stdin.flush()
 
     def read_message(self):
-        while True:
-            batch = self.conn.recv(1024)
-            if batch:
-                self.buffer += batch
-                eol_index = self.buffer.rindex(b'\n')
-                if eol_index != -1:
-                    eol_index += 1
-                    break
-            else:
+        # one line per call, the rest stays buffered for the next one
+        eol_index = self.buffer.find(b'\n')
+        while eol_index == -1:
+            batch = self.conn.recv(1 << 16)
+            if not batch:
                 sys.exit()
 
+            start = len(self.buffer)
+            self.buffer += batch
+            eol_index = self.buffer.find(b'\n', start)
+
+        eol_index += 1
+
         msg = self.buffer[:eol_index]
         self.buffer = self.buffer[eol_index:]
 
@@ -50,7 +54,7 @@ class TCPClient:
 
             # send command
             command = self.process.stdout.readline()
-            self.conn.send(command)
+            self.conn.sendall(command)
 
     def on_exit(self):
         self.process.terminate()
@@ -0,0 +1,54 @@
+import unittest
+
+from actions import Move, Fire
+from action_masks import MOVE_OFFSETS, FIRE_OFFSETS, decode_mask
+from exceptions import InvalidAction
+from game import Game
+
+
+class ActionMasksTestCase(unittest.TestCase):
+    def legal_targets(self, action_cls, game, offsets):
+        unit = game.units[0]
+        targets = set()
+        for dx, dy in offsets:
+            target = (unit.position[0] + dx, unit.position[1] + dy)
+            try:
+                action_cls(0, *target, game)
+            except InvalidAction:
+                continue
+            targets.add(target)
+
+        return targets
+
+    def test_masks_match_validation(self):
+        for position in [(0, 0), (1, 0), (2, 2), (4, 3), (0, 3)]:
+            with self.subTest(position=position):
+                teams = [
+                    [{"id": 0, "spawn_x": 0, "spawn_y": 0, "position_x": position[0], "position_y": position[1]}]
+                ]
+                game = Game(5, 4, teams)
+
+                move_mask, fire_mask = game.get_legal_actions()[0]
+
+                self.assertEqual(set(decode_mask(move_mask, position, MOVE_OFFSETS)),
+                                 self.legal_targets(Move, game, MOVE_OFFSETS))
+                self.assertEqual(set(decode_mask(fire_mask, position, FIRE_OFFSETS)),
+                                 self.legal_targets(Fire, game, FIRE_OFFSETS))
+
+    def test_team_filter(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 5, "spawn_y": 5}]
+        ]
+        game = Game(10, 10, teams)
+
+        self.assertEqual(list(game.get_legal_actions(team=1)), [1])
+        self.assertEqual(game.get_legal_actions(team=1)[1], (0b111111111, (1 << 25) - 1))
+
+    def test_render(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}]
+        ]
+        game = Game(10, 10, teams)
+
+        self.assertEqual(game.render_legal_actions(), [{'unit_id': 0, 'move': 0b110110000, 'fire': 0b1110011100111000000000000}])
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from actions import Move
+from checkpoint import CheckpointWriter, has_checkpoint, load_checkpoint, LOG_FILE
+from exceptions import InitializationError
+from game import Game
+
+
+class CheckpointTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        self.game = Game(10, 10, teams)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def play(self, game, ticks, interval):
+        async def play():
+            writer = CheckpointWriter(game, self.directory.name, interval)
+            await writer.start()
+            for _ in range(ticks):
+                unit = game.units[0]
+                game.apply_actions([Move(0, unit.position[0] + 1, unit.position[1], game)])
+                writer.on_tick(game.get_current_state())
+            await writer.stop()
+
+        asyncio.run(play())
+
+    def test_game_roundtrip(self):
+        self.game.apply_actions([Move(0, 1, 1, self.game)])
+
+        game = Game.from_checkpoint(self.game.to_checkpoint(), self.game.log)
+
+        self.assertEqual(game.ticks, 1)
+        self.assertEqual(game.units[0].position, (1, 1))
+        self.assertEqual(game.units[0].spawn, (0, 0))
+        self.assertIs(game.occupancy[(1, 1)], game.units[0])
+        self.assertEqual(game.get_map_config(1), self.game.get_map_config(1))
+
+    def test_resume(self):
+        self.play(self.game, 3, interval=2)
+
+        game = load_checkpoint(self.directory.name)
+        self.assertEqual(game.ticks, 3)
+        self.assertEqual(game.units[0].position, (3, 0))
+        self.assertEqual(game.log, self.game.log)
+
+        self.play(game, 2, interval=2)
+
+        game = load_checkpoint(self.directory.name)
+        self.assertEqual(game.ticks, 5)
+        self.assertEqual(len(game.log), 5)
+
+    def test_log_after_checkpoint_is_dropped(self):
+        self.play(self.game, 2, interval=2)
+        with open(os.path.join(self.directory.name, LOG_FILE), 'a') as f:
+            f.write('{"units": [], "actions": []}\n')
+
+        game = load_checkpoint(self.directory.name)
+        self.play(game, 1, interval=1)
+
+        with open(os.path.join(self.directory.name, LOG_FILE)) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_new_game_removes_checkpoint(self):
+        self.play(self.game, 2, interval=2)
+
+        teams = [[{"id": 0, "spawn_x": 0, "spawn_y": 0}], [{"id": 1, "spawn_x": 9, "spawn_y": 9}]]
+        self.play(Game(10, 10, teams), 0, interval=2)
+        self.assertFalse(has_checkpoint(self.directory.name))
+
+    def test_short_log(self):
+        self.play(self.game, 2, interval=2)
+        open(os.path.join(self.directory.name, LOG_FILE), 'w').close()
+
+        with self.assertRaises(InitializationError):
+            load_checkpoint(self.directory.name)
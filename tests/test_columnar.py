@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from actions import Move, Fire
+from game import Game
+
+if np is not None:
+    from columnar import export_log, load, aggregate
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [
+                {"id": 1, "spawn_x": 2, "spawn_y": 2},
+                {"id": 2, "spawn_x": 9, "spawn_y": 9}
+            ]
+        ]
+        self.game = Game(10, 10, teams)
+        self.game.apply_actions([Move(0, 1, 1, self.game)])
+        self.game.apply_actions([Fire(0, 2, 2, self.game)])
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'game.npz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export(self):
+        export_log(self.game.log, self.path, self.game.map_config)
+        tables = load(self.path)
+
+        self.assertEqual(tables['positions']['tick'].tolist(), [1, 1, 1, 2, 2])
+        self.assertEqual(tables['positions']['unit_id'].tolist(), [0, 1, 2, 0, 2])
+        self.assertEqual(tables['actions']['kind'].tolist(), [0, 1])
+        self.assertEqual(tables['actions']['x'].tolist(), [1, 2])
+        self.assertEqual(tables['units']['team'].tolist(), [0, 1, 1])
+        self.assertEqual(tables['map']['width'].tolist(), [10])
+
+    def test_aggregate(self):
+        export_log(self.game.log, self.path, self.game.map_config)
+        other_path = os.path.join(self.directory.name, 'other.npz')
+        export_log(self.game.log, other_path)
+
+        stats = aggregate([self.path, other_path])
+
+        self.assertEqual(stats['games'], 2)
+        # game without units table is not counted in win rates, teams have one unit each
+        self.assertEqual(stats['win_rates'], {0: 1.0, 1: 1.0})
+        self.assertEqual(stats['heatmap'].sum(), 10)
+        self.assertEqual(stats['kill_map'][2, 2], 2)
+        self.assertEqual(stats['kill_map'].sum(), 2)
+
+    def test_deaths_after_moves(self):
+        teams = [[{"id": 0, "spawn_x": 5, "spawn_y": 2}], [{"id": 1, "spawn_x": 2, "spawn_y": 2}]]
+        game = Game(10, 10, teams)
+        # unit moves into the shot on the first tick
+        game.apply_actions([Move(1, 3, 2, game), Fire(0, 3, 2, game)])
+        self.assertEqual(set(game.units), {0})
+
+        export_log(game.log, self.path, game.map_config)
+        deaths = load(self.path)['deaths']
+
+        self.assertEqual(deaths['tick'].tolist(), [1])
+        self.assertEqual(deaths['unit_id'].tolist(), [1])
+        self.assertEqual((deaths['x'].tolist(), deaths['y'].tolist()), ([3], [2]))
+        self.assertEqual(aggregate([self.path])['kill_map'][2, 3], 1)
+
+    def test_aggregate_no_survivors(self):
+        teams = [[{"id": 0, "spawn_x": 0, "spawn_y": 0}], [{"id": 1, "spawn_x": 3, "spawn_y": 3}]]
+        game = Game(10, 10, teams)
+        game.apply_actions([Move(0, 1, 1, game)])
+        game.apply_actions([Fire(0, 3, 3, game), Fire(1, 1, 1, game)])
+        self.assertEqual(game.get_winners(), [])
+
+        export_log(game.log, self.path, game.map_config)
+        stats = aggregate([self.path])
+
+        self.assertEqual(load(self.path)['game']['ticks'].tolist(), [2])
+        self.assertEqual(stats['win_rates'], {})
+        self.assertEqual(stats['kill_map'].sum(), 2)
@@ -127,6 +127,38 @@ class FireTestCase(unittest.TestCase):
 
         self.assertEqual(len(game.units), 0)
 
+    def test_fire_stats(self):
+        teams = [
+            [
+                {"id": 0, "spawn_x": 0, "spawn_y": 0},
+                {"id": 1, "spawn_x": 1, "spawn_y": 0}
+            ],
+            [{"id": 2, "spawn_x": 2, "spawn_y": 2}]
+        ]
+        game = Game(10, 10, teams)
+
+        # both shooters hit the same unit, the last one also misses
+        actions = [Fire(0, 2, 2, game), Fire(1, 2, 2, game), Fire(1, 3, 2, game)]
+        fire_stats = game.fire(actions)
+
+        self.assertEqual(fire_stats, [
+            {'unit_id': 0, 'shots': 1, 'hits': 1},
+            {'unit_id': 1, 'shots': 2, 'hits': 1}
+        ])
+        self.assertNotIn(2, game.units)
+        self.assertNotIn((2, 2), game.occupancy)
+
+    def test_fire_stats_in_log(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 2, "spawn_y": 2}]
+        ]
+        game = Game(10, 10, teams)
+
+        game.apply_actions([Fire(1, 0, 0, game)])
+
+        self.assertEqual(game.get_current_state()['fire_stats'], [{'unit_id': 1, 'shots': 1, 'hits': 1}])
+
 
 class MoveConflictResolution(unittest.TestCase):
     def test_free_move(self):
@@ -183,4 +215,134 @@ class MoveConflictResolution(unittest.TestCase):
         self.assertEqual(len(non_conflict_moves), 0)
         self.assertEqual(len(busy_positions), 3)
 
-    # TODO test Teleports
+    def test_chain(self):
+        teams = [
+            [
+                {"id": 0, "spawn_x": 0, "spawn_y": 0},
+                {"id": 1, "spawn_x": 1, "spawn_y": 0},
+                {"id": 2, "spawn_x": 2, "spawn_y": 0}
+            ]
+        ]
+        game = Game(10, 10, teams)
+
+        # the last unit is listed first, result must not depend on the order
+        actions = [Move(0, 1, 0, game), Move(1, 2, 0, game), Move(2, 3, 0, game)]
+        for ordered_actions in (actions, actions[::-1]):
+            with self.subTest(ordered_actions=ordered_actions):
+                busy_positions, non_conflict_moves = game.resolve_move_conflicts(ordered_actions)
+                self.assertEqual(len(non_conflict_moves), 3)
+                self.assertEqual(len(busy_positions), 0)
+
+    def test_blocked_chain(self):
+        teams = [
+            [
+                {"id": 0, "spawn_x": 0, "spawn_y": 0},
+                {"id": 1, "spawn_x": 1, "spawn_y": 0},
+                {"id": 2, "spawn_x": 2, "spawn_y": 0}
+            ]
+        ]
+        game = Game(10, 10, teams)
+
+        actions = [Move(0, 1, 0, game), Move(1, 2, 0, game)]
+        busy_positions, non_conflict_moves = game.resolve_move_conflicts(actions)
+
+        self.assertEqual(len(non_conflict_moves), 0)
+        self.assertEqual(busy_positions, {(0, 0), (1, 0)})
+
+    def test_rotation(self):
+        teams = [
+            [
+                {"id": 0, "spawn_x": 0, "spawn_y": 0},
+                {"id": 1, "spawn_x": 1, "spawn_y": 0},
+                {"id": 2, "spawn_x": 1, "spawn_y": 1},
+                {"id": 3, "spawn_x": 0, "spawn_y": 1}
+            ]
+        ]
+        game = Game(10, 10, teams)
+
+        actions = [Move(0, 1, 0, game), Move(1, 1, 1, game), Move(2, 0, 1, game), Move(3, 0, 0, game)]
+        game.apply_actions(actions)
+
+        positions = {unit.id: unit.position for unit in game.units.values()}
+        self.assertEqual(positions, {0: (1, 0), 1: (1, 1), 2: (0, 1), 3: (0, 0)})
+        self.assertEqual(set(game.occupancy), {(0, 0), (1, 0), (1, 1), (0, 1)})
+
+    def test_several_moves_of_unit(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}]
+        ]
+        game = Game(10, 10, teams)
+
+        actions = [Move(0, 1, 0, game), Move(0, 0, 1, game)]
+        busy_positions, non_conflict_moves = game.resolve_move_conflicts(actions)
+
+        self.assertEqual(len(non_conflict_moves), 0)
+        self.assertEqual(busy_positions, {(0, 0)})
+
+    def test_teleport(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0, "position_x": 5, "position_y": 5}]
+        ]
+        game = Game(10, 10, teams)
+
+        game.apply_actions([Teleport(0, game)])
+
+        self.assertEqual(game.units[0].position, (0, 0))
+
+
+class GameEndTestCase(unittest.TestCase):
+    def test_not_ended_at_start(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        game = Game(10, 10, teams)
+
+        self.assertFalse(game.is_ended())
+
+    def test_one_team_left(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 2, "spawn_y": 2}]
+        ]
+        game = Game(10, 10, teams)
+        game.apply_actions([Fire(0, 2, 2, game)])
+
+        self.assertTrue(game.is_ended())
+        self.assertEqual(game.end_reason, 'one_team_left')
+
+    def test_no_units(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 2, "spawn_y": 2}]
+        ]
+        game = Game(10, 10, teams)
+        game.apply_actions([Fire(0, 2, 2, game), Fire(1, 0, 0, game)])
+
+        self.assertEqual(game.end_reason, 'no_units')
+
+    def test_stalemate(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        game = Game(10, 10, teams, stalemate_ticks=2)
+
+        game.apply_actions([Move(0, 1, 1, game)])
+        game.apply_actions([])
+        self.assertFalse(game.is_ended())
+
+        game.apply_actions([Move(0, 1, 1, game)])
+        self.assertEqual(game.end_reason, 'stalemate')
+
+    def test_tick_limit(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+        ]
+        game = Game(10, 10, teams, max_ticks=2)
+
+        game.apply_actions([Move(0, 1, 1, game)])
+        self.assertFalse(game.is_ended())
+
+        game.apply_actions([Move(0, 2, 2, game)])
+        self.assertEqual(game.end_reason, 'tick_limit')
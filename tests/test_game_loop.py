@@ -0,0 +1,160 @@
+import asyncio
+import unittest
+
+from clients import Client, DISCONNECT
+from game import Game
+from game_loop import GameLoop
+
+
+class BufferedClient(Client):
+    def __init__(self, buffered=0):
+        self.buffered = buffered
+        self.frames = []
+        self.disconnected = False
+
+    def send_frame(self, frame):
+        self.frames.append(frame)
+
+    def write_buffer_size(self):
+        return self.buffered
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class ClosedClient(BufferedClient):
+    # write of the coalesced frames fails
+    def flush(self):
+        raise ConnectionResetError('Transport is closed')
+
+
+class IdleClient(BufferedClient):
+    transport = 'pipe'
+
+    async def send_message(self, msg):
+        self.frames.append(msg)
+
+    async def get_command(self):
+        return []
+
+
+class SleepyClient(IdleClient):
+    # waits in wall time but burns a scripted amount of CPU time every command
+    def __init__(self, wait, cpu_per_command):
+        super().__init__()
+        self.wait = wait
+        self.cpu_per_command = cpu_per_command
+        self.used = 0.0
+
+    def cpu_time(self):
+        return self.used
+
+    async def get_command(self):
+        await asyncio.sleep(self.wait)
+        self.used += self.cpu_per_command
+        return []
+
+
+class BroadcastTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}],
+            [{"id": 2, "spawn_x": 5, "spawn_y": 5}]
+        ]
+        self.game = Game(10, 10, teams)
+
+    def test_frame_is_shared(self):
+        clients = [BufferedClient(), BufferedClient(), BufferedClient()]
+        game_loop = GameLoop(self.game, clients)
+
+        receivers = game_loop.broadcast('{"units": []}')
+
+        self.assertEqual(receivers, [0, 1, 2])
+        self.assertEqual(clients[0].frames, [b'{"units": []}\n'])
+        self.assertIs(clients[0].frames[0], clients[2].frames[0])
+
+    def test_slow_client_skips_frame(self):
+        clients = [BufferedClient(), BufferedClient(buffered=100), BufferedClient()]
+        game_loop = GameLoop(self.game, clients, high_water_mark=10)
+
+        receivers = game_loop.broadcast('{}')
+
+        self.assertEqual(receivers, [0, 2])
+        self.assertEqual(clients[1].frames, [])
+        self.assertFalse(clients[1].disconnected)
+        self.assertEqual(game_loop.summary()['clients'][1]['skipped_frames'], 1)
+
+    def test_slow_client_disconnect(self):
+        clients = [BufferedClient(), BufferedClient(buffered=100), BufferedClient()]
+        game_loop = GameLoop(self.game, clients, high_water_mark=10, backpressure_policy=DISCONNECT)
+
+        receivers = game_loop.broadcast('{}')
+
+        self.assertEqual(receivers, [0, 2])
+        self.assertTrue(clients[1].disconnected)
+        self.assertNotIn(1, game_loop.clients)
+
+    def test_failed_flush(self):
+        clients = [ClosedClient(), BufferedClient(), BufferedClient()]
+        game_loop = GameLoop(self.game, clients)
+
+        receivers = game_loop.broadcast('{}')
+
+        self.assertEqual(receivers, [1, 2])
+        self.assertTrue(clients[0].disconnected)
+        self.assertEqual(game_loop.failed_clients, [0])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            GameLoop(self.game, [], backpressure_policy='ignore')
+
+
+class PlayTestCase(unittest.TestCase):
+    def test_play(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        game = Game(10, 10, teams, max_ticks=3)
+        clients = [IdleClient(), IdleClient()]
+        game_loop = GameLoop(game, clients, log_path=None)
+
+        asyncio.run(game_loop.play())
+        summary = game_loop.summary()
+
+        # map config and a state for every tick
+        self.assertEqual(len(clients[0].frames), 1 + 3)
+        self.assertTrue(all(client.disconnected for client in clients))
+        self.assertEqual(summary['ticks'], 3)
+        self.assertEqual(summary['failed_clients'], [])
+        self.assertIsNotNone(summary['tick_duration']['p99'])
+
+
+class CpuAccountingTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        self.game = Game(10, 10, teams)
+
+    def test_wall_time_not_charged(self):
+        clients = [SleepyClient(0.05, 0.001), SleepyClient(0.0, 0.0)]
+        game_loop = GameLoop(self.game, clients, tick_timeout=0.02, time_bank=0.01, cpu_accounting=True)
+
+        asyncio.run(game_loop.get_commands([0, 1]))
+        summary = game_loop.summary()
+
+        self.assertEqual(game_loop.failed_clients, [])
+        self.assertAlmostEqual(summary['clients'][0]['total_time'], 0.001)
+        self.assertAlmostEqual(summary['clients'][0]['cpu_time'], 0.001)
+
+    def test_cpu_budget_exhausted(self):
+        clients = [SleepyClient(0.0, 0.05), SleepyClient(0.0, 0.0)]
+        game_loop = GameLoop(self.game, clients, tick_timeout=0.02, time_bank=0.01, cpu_accounting=True)
+
+        commands = asyncio.run(game_loop.get_commands([0, 1]))
+
+        self.assertEqual(commands, [(1, [])])
+        self.assertEqual(game_loop.failed_clients, [0])
@@ -0,0 +1,91 @@
+import json
+import mmap
+import os
+import tempfile
+import unittest
+
+from actions import Move
+from exceptions import InitializationError
+from game import Game
+from map_cache import CompiledMap, MapCache, compile_map
+
+
+MAP_CONFIG = {
+    'map_width': 10,
+    'map_height': 10,
+    'teams': [
+        [{'id': 0, 'spawn_x': 0, 'spawn_y': 0}, {'id': 2, 'spawn_x': 3, 'spawn_y': 3, 'position_x': 4, 'position_y': 3}],
+        [{'id': 1, 'spawn_x': 9, 'spawn_y': 9}]
+    ]
+}
+
+
+class CompiledMapTestCase(unittest.TestCase):
+    def test_same_game(self):
+        game = Game.from_map_config(MAP_CONFIG, max_ticks=5)
+        compiled_game = CompiledMap(compile_map(MAP_CONFIG)).new_game(max_ticks=5)
+
+        self.assertEqual(compiled_game.map_config, game.map_config)
+        self.assertEqual([(unit.id, unit.team, unit.spawn, unit.position) for unit in compiled_game.units.values()],
+                         [(unit.id, unit.team, unit.spawn, unit.position) for unit in game.units.values()])
+        self.assertEqual(compiled_game.remaining_teams, game.remaining_teams)
+        self.assertEqual(compiled_game.max_ticks, 5)
+
+        for target in [(1, 0), (2, 0), (3, 0)]:
+            for current in (game, compiled_game):
+                current.apply_actions([Move(0, *target, current)])
+        self.assertEqual(compiled_game.log, game.log)
+
+    def test_map_config_message(self):
+        game = CompiledMap(compile_map(MAP_CONFIG)).new_game()
+
+        self.assertEqual(json.loads(game.render_map_config(1)), game.get_map_config(1))
+        self.assertEqual(json.loads(Game.from_map_config(MAP_CONFIG).render_map_config(0)), game.get_map_config(0))
+
+    def test_invalid_map(self):
+        with self.assertRaises(InitializationError):
+            compile_map({'map_width': 1, 'map_height': 1, 'teams': [[{'id': 0, 'spawn_x': 5, 'spawn_y': 5}]]})
+
+    def test_truncated(self):
+        with self.assertRaises(InitializationError):
+            CompiledMap(compile_map(MAP_CONFIG)[:-1])
+
+
+class MapCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_compiled_once(self):
+        compiled_map = MapCache(self.directory.name).get(MAP_CONFIG)
+        files = os.listdir(self.directory.name)
+        self.assertEqual(len(files), 1)
+
+        # another process maps the file
+        cached_map = MapCache(self.directory.name).get(MAP_CONFIG)
+        self.assertIsInstance(cached_map.buffer, mmap.mmap)
+        self.assertEqual(cached_map.units, compiled_map.units)
+        self.assertEqual(os.listdir(self.directory.name), files)
+
+    def test_map_file(self):
+        path = os.path.join(self.directory.name, 'map.json')
+        with open(path, 'w') as f:
+            json.dump(MAP_CONFIG, f)
+
+        cache = MapCache(os.path.join(self.directory.name, 'cache'))
+        self.assertIs(cache.get_file(path), cache.get_file(path))
+
+    def test_broken_file_recompiled(self):
+        MapCache(self.directory.name).get(MAP_CONFIG)
+        path = os.path.join(self.directory.name, os.listdir(self.directory.name)[0])
+        with open(path, 'wb') as f:
+            f.write(b'RMAP')
+
+        game = MapCache(self.directory.name).get(MAP_CONFIG).new_game()
+        self.assertEqual(len(game.units), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
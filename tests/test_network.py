@@ -0,0 +1,104 @@
+import asyncio
+import json
+import socket
+import sys
+import unittest
+
+from clients import TCPClient
+from game import Game
+from game_loop import GameLoop
+from network import PROFILES, configure_socket, socket_rtt
+
+
+class ConfigureSocketTestCase(unittest.TestCase):
+    def test_default_keeps_nagle(self):
+        with socket.socket() as sock:
+            configure_socket(sock, PROFILES['default'])
+            self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 0)
+
+    def test_low_latency(self):
+        with socket.socket() as sock:
+            configure_socket(sock, PROFILES['low-latency'])
+            self.assertNotEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 0)
+            self.assertGreaterEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), 1 << 20)
+
+    def test_rtt_without_socket(self):
+        self.assertIsNone(socket_rtt(None))
+
+
+class TCPClientTestCase(unittest.TestCase):
+    async def connect(self, profile):
+        accepted = asyncio.Future()
+
+        async def on_connect(reader, writer):
+            accepted.set_result(TCPClient(reader, writer, profile))
+
+        server = await asyncio.start_server(on_connect, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        client = await accepted
+        return server, client, reader, writer
+
+    def test_coalesced_writes(self):
+        async def run():
+            server, client, reader, writer = await self.connect(PROFILES['low-latency'])
+
+            await client.send_message('{"config": 1}')
+            client.send_frame(b'{"state": 1}\n')
+            # nothing is written before the flush
+            self.assertEqual(client.write_buffer_size(), 0)
+
+            client.flush()
+            self.assertEqual(await reader.readline(), b'{"config": 1}\n')
+            self.assertEqual(await reader.readline(), b'{"state": 1}\n')
+
+            if sys.platform.startswith('linux'):
+                self.assertIsInstance(client.rtt(), float)
+
+            writer.close()
+            client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
+
+    def test_map_config_above_high_water_mark(self):
+        async def run():
+            server, client, reader, writer = await self.connect(PROFILES['low-latency'])
+            game = Game(10, 10, [[{'id': 0, 'spawn_x': 0, 'spawn_y': 0}]])
+            game_loop = GameLoop(game, [client], high_water_mark=10, log_path=None)
+
+            # map config is coalesced with the first state and is not mistaken for a backlog
+            map_config = json.dumps({'config': 'x' * 100})
+            await game_loop.send_message_wrapper(0, map_config)
+            self.assertEqual(game_loop.broadcast('{"state": 1}'), [0])
+
+            self.assertEqual(await reader.readline(), (map_config + '\n').encode())
+            self.assertEqual(await reader.readline(), b'{"state": 1}\n')
+            self.assertEqual(game_loop.skipped_frames[0], 0)
+
+            writer.close()
+            client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
+
+    def test_default_writes_immediately(self):
+        async def run():
+            server, client, reader, writer = await self.connect(PROFILES['default'])
+
+            client.send_frame(b'{"state": 1}\n')
+            self.assertEqual(await reader.readline(), b'{"state": 1}\n')
+            self.assertIsNone(client.rtt())
+
+            writer.close()
+            client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import random
+import unittest
+
+from game import Game
+from parallel import ParallelGame, strip_bounds
+
+
+def random_map(rng, width, height, teams, units):
+    cells = rng.sample([(x, y) for x in range(width) for y in range(height)], 2 * units)
+    map_teams = [[] for _ in range(teams)]
+    for unit_id in range(units):
+        spawn, position = cells[2 * unit_id], cells[2 * unit_id + 1]
+        unit = {'id': unit_id, 'spawn_x': spawn[0], 'spawn_y': spawn[1]}
+        if rng.random() < 0.5:
+            unit.update(position_x=position[0], position_y=position[1])
+        map_teams[rng.randrange(teams)].append(unit)
+
+    return {'map_width': width, 'map_height': height, 'teams': map_teams}
+
+
+def random_commands(rng, game, teams):
+    # mostly legal moves and fire with conflicts, several actions of a unit, foreign units and garbage
+    commands = {team: [] for team in range(teams)}
+    for unit in game.units.values():
+        x, y = unit.position
+        team = unit.team if rng.random() < 0.95 else rng.randrange(teams)
+        for _ in range(1 if rng.random() < 0.9 else 2):
+            kind = rng.random()
+            if kind < 0.7:
+                action = {'action': 'move', 'properties': {'unit_id': unit.id, 'x': x + rng.randint(-1, 1),
+                                                           'y': y + rng.choice((-1, 1, 1, 2))}}
+            elif kind < 0.75:
+                action = {'action': 'teleport', 'properties': {'unit_id': unit.id}}
+            elif kind < 0.95:
+                action = {'action': 'fire', 'properties': {'unit_id': unit.id, 'x': x + rng.randint(-3, 3),
+                                                           'y': y + rng.randint(-3, 3)}}
+            else:
+                action = rng.choice([
+                    {'action': 'move', 'properties': {'unit_id': unit.id, 'x': 1.5, 'y': 0}},
+                    {'action': 'move', 'properties': {'unit_id': unit.id}},
+                    {'action': 'jump', 'properties': {'unit_id': unit.id}},
+                    {'action': 'fire', 'properties': {'unit_id': -1, 'x': 0, 'y': 0}},
+                    {'properties': {}},
+                    'move',
+                ])
+            commands[team].append(action)
+
+    for command in commands.values():
+        rng.shuffle(command)
+    return commands
+
+
+def sorted_tick(tick_log):
+    # tiles log units and actions in tile order
+    return {name: sorted(items, key=lambda item: json.dumps(item, sort_keys=True)) for name, items in tick_log.items()}
+
+
+class StripBoundsTestCase(unittest.TestCase):
+    def test_bounds(self):
+        self.assertEqual(strip_bounds(10, 3), [0, 3, 6, 10])
+        self.assertEqual(strip_bounds(2, 5), [0, 1, 2])
+
+
+class ParallelGameTestCase(unittest.TestCase):
+    def assert_same_game(self, map_config, teams, ticks, num_tiles, num_workers=0, seed=0):
+        rng = random.Random(seed)
+        game = Game.from_map_config(map_config, max_ticks=None, stalemate_ticks=None)
+        with ParallelGame(Game.from_map_config(map_config, max_ticks=None, stalemate_ticks=None),
+                          num_tiles, num_workers) as parallel_game:
+            for tick in range(ticks):
+                commands = random_commands(rng, game, teams)
+                game.tick(commands)
+                parallel_game.tick(commands)
+
+                if num_tiles == 1:
+                    self.assertEqual(parallel_game.log[-1], game.log[-1], f'tick {tick}')
+                self.assertEqual(sorted_tick(parallel_game.log[-1]), sorted_tick(game.log[-1]), f'tick {tick}')
+                self.assertEqual(parallel_game.idle_ticks, game.idle_ticks)
+                self.assertEqual(parallel_game.remaining_teams, game.remaining_teams)
+
+            self.assertEqual(parallel_game.get_winners(), game.get_winners())
+            self.assertEqual(parallel_game.end_reason, game.end_reason)
+            # positions are pulled from the tiles
+            self.assertEqual({unit.id: unit.position for unit in parallel_game.units.values()},
+                             {unit.id: unit.position for unit in game.units.values()})
+            self.assertEqual(parallel_game.occupancy.keys(), game.occupancy.keys())
+            self.assertEqual(parallel_game.spawns.keys(), game.spawns.keys())
+
+    def test_random_games(self):
+        for seed in range(10):
+            map_config = random_map(random.Random(seed), 12, 12, 3, 60)
+            for num_tiles in (1, 3, 12):
+                with self.subTest(seed=seed, num_tiles=num_tiles):
+                    self.assert_same_game(map_config, 3, 20, num_tiles, seed=seed)
+
+    def test_workers(self):
+        map_config = random_map(random.Random(1), 16, 16, 2, 100)
+        self.assert_same_game(map_config, 2, 10, 4, num_workers=2)
+
+    def test_chain_and_cycle_across_tiles(self):
+        # a column marching down through all the tiles and a 2x2 rotation on a border
+        units = [{'id': y, 'spawn_x': 0, 'spawn_y': y} for y in range(7)]
+        units += [{'id': 10, 'spawn_x': 4, 'spawn_y': 2}, {'id': 11, 'spawn_x': 5, 'spawn_y': 2},
+                  {'id': 12, 'spawn_x': 5, 'spawn_y': 3}, {'id': 13, 'spawn_x': 4, 'spawn_y': 3}]
+        commands = {0: [{'action': 'move', 'properties': {'unit_id': y, 'x': 0, 'y': y + 1}} for y in range(7)]}
+        for unit_id, x, y in [(10, 5, 2), (11, 5, 3), (12, 4, 3), (13, 4, 2)]:
+            commands[0].append({'action': 'move', 'properties': {'unit_id': unit_id, 'x': x, 'y': y}})
+
+        game = Game(6, 8, [units])
+        with ParallelGame(Game(6, 8, [units]), 4) as parallel_game:
+            game.tick(commands)
+            parallel_game.tick(commands)
+
+        self.assertEqual(len(parallel_game.log[-1]['actions']), 11)
+        self.assertEqual(sorted_tick(parallel_game.log[-1]), sorted_tick(game.log[-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
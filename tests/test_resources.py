@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from clients import ProcessClient
+from resources import ProcessUsage, ResourceLimits, process_tree, strategy_limits
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'needs /proc')
+class ProcessUsageTestCase(unittest.TestCase):
+    def test_own_usage(self):
+        usage = ProcessUsage(os.getpid())
+        started = time.process_time()
+        while time.process_time() - started < 0.05:
+            pass
+
+        self.assertGreater(usage.sample(), 0)
+        self.assertGreater(usage.peak_rss, 0)
+
+    def test_tree_and_exit(self):
+        process = subprocess.Popen('sleep 5; true', shell=True)
+        try:
+            tree = process_tree(process.pid)
+            self.assertEqual(tree[0], process.pid)
+
+            usage = ProcessUsage(process.pid)
+            usage.sample()
+            peak_rss = usage.peak_rss
+            self.assertGreater(peak_rss, 0)
+        finally:
+            process.kill()
+            process.wait()
+
+        # values of the last sample survive the process
+        usage.sample()
+        self.assertEqual(usage.peak_rss, peak_rss)
+
+    def test_tree_is_cached(self):
+        process = subprocess.Popen('sleep 5; true', shell=True)
+        try:
+            usage = ProcessUsage(process.pid)
+            usage.sample()
+            tree = usage.tree
+            usage.sample()
+            self.assertIs(usage.tree, tree)
+        finally:
+            process.kill()
+            process.wait()
+
+
+class ReapedProcess:
+    # killed process is reaped at once, as by the child watcher of asyncio
+    def __init__(self, process):
+        self.process = process
+        self.pid = process.pid
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class MissingProcessTestCase(unittest.TestCase):
+    def test_missing_process(self):
+        # exited strategy or no /proc at all, last known values are reported
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+
+        usage = ProcessUsage(process.pid)
+        self.assertEqual(usage.sample(), 0.0)
+        self.assertEqual(usage.peak_rss, 0)
+
+    def test_disconnect_kills(self):
+        process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+        client = ProcessClient(process)
+        client.disconnect()
+
+        self.assertEqual(process.wait(timeout=5), -9)
+        self.assertIsInstance(client.cpu_time(), float)
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'needs /proc')
+    def test_usage_reported_after_disconnect(self):
+        # strategy burns CPU and memory, then waits for the next state
+        code = ('import sys, time\n'
+                'data = bytearray(64 << 20)\n'
+                'started = time.process_time()\n'
+                'while time.process_time() - started < 0.2: pass\n'
+                'print(flush=True)\n'
+                'time.sleep(30)\n')
+        process = ReapedProcess(subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE))
+        process.process.stdout.readline()
+
+        client = ProcessClient(process)
+        client.disconnect()
+
+        self.assertGreater(client.cpu_time(), 0.1)
+        self.assertGreater(client.peak_rss(), 64 << 20)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'needs rlimits and affinity')
+class ResourceLimitsTestCase(unittest.TestCase):
+    def test_memory_limit(self):
+        limits = ResourceLimits(memory=256 << 20)
+        result = subprocess.run([sys.executable, '-c', 'bytearray(512 << 20)'], preexec_fn=limits.apply,
+                                stderr=subprocess.PIPE)
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn(b'MemoryError', result.stderr)
+
+    def test_pinning(self):
+        cpus = sorted(os.sched_getaffinity(0))
+        limits = strategy_limits(len(cpus) + 1, pin_cpus=True)
+
+        self.assertEqual([limit.cpu for limit in limits], cpus + cpus[:1])
+        self.assertFalse(strategy_limits(1)[0])
@@ -0,0 +1,58 @@
+import io
+import json
+import unittest
+
+from game import Game
+from shared_state import SharedStateWriter, SharedStateReader, connect
+
+
+class SharedStateTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9, "position_x": 5, "position_y": 6}]
+        ]
+        self.game = Game(10, 10, teams)
+        self.writer = SharedStateWriter(len(self.game.units), slot_count=2)
+
+    def tearDown(self):
+        self.writer.close()
+
+    def test_read_published_state(self):
+        seq = self.writer.publish(7, self.game.units.values())
+        reader = SharedStateReader(self.writer.describe(), io.BytesIO(self.writer.notification))
+
+        state = reader.wait()
+
+        self.assertEqual(state.seq, seq)
+        self.assertEqual(state.tick, 7)
+        self.assertEqual(list(state.iter_units()), [(0, 0, 0), (1, 5, 6)])
+        state.units.release()
+        reader.close()
+
+    def test_overwritten_snapshot(self):
+        first = self.writer.publish(0, self.game.units.values())
+        self.writer.publish(1, self.game.units.values())
+        self.writer.publish(2, self.game.units.values())
+        reader = SharedStateReader(self.writer.describe())
+
+        with self.assertRaises(ValueError):
+            reader.read(first)
+
+        state = reader.latest()
+        self.assertEqual(state.tick, 2)
+        state.units.release()
+        reader.close()
+
+    def test_connect(self):
+        self.writer.publish(0, self.game.units.values())
+        config = {**self.game.get_map_config(0), 'shared_state': self.writer.describe()}
+        stream = io.BytesIO(json.dumps(config).encode() + b'\n' + self.writer.notification)
+
+        received_config, reader = connect(stream)
+        state = reader.wait()
+
+        self.assertEqual(received_config['my_team_id'], 0)
+        self.assertEqual(state.unit_count, 2)
+        state.units.release()
+        reader.close()
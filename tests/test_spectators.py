@@ -0,0 +1,129 @@
+import asyncio
+import json
+import unittest
+
+from actions import Move
+from clients import Client
+from game import Game
+from game_loop import GameLoop
+from runner import start_spectators
+from spectators import SpectatorServer
+
+
+class IdleClient(Client):
+    transport = 'pipe'
+
+    def send_frame(self, frame):
+        pass
+
+    def write_buffer_size(self):
+        return 0
+
+    async def send_message(self, msg):
+        pass
+
+    async def get_command(self):
+        return []
+
+    def disconnect(self):
+        pass
+
+
+class SpectatorServerTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        self.game = Game(10, 10, teams)
+
+    async def connect(self, spectators, options=None):
+        port = spectators.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write((json.dumps(options) if options else '').encode() + b'\n')
+        map_config = json.loads(await reader.readline())
+        return reader, writer, map_config
+
+    def tick(self, spectators, x):
+        self.game.apply_actions([Move(0, x, 0, self.game)])
+        spectators.on_tick(self.game.get_current_state())
+
+    def test_stream(self):
+        async def run():
+            spectators = SpectatorServer(self.game, '127.0.0.1', 0)
+            await spectators.start()
+
+            full_reader, full_writer, map_config = await self.connect(spectators)
+            decimated_reader, decimated_writer, _ = await self.connect(spectators, {'every': 2})
+            delta_reader, delta_writer, _ = await self.connect(spectators, {'delta': True})
+
+            for x in (1, 2):
+                self.tick(spectators, x)
+
+            full_frames = [json.loads(await full_reader.readline()) for _ in range(2)]
+            decimated_frame = json.loads(await decimated_reader.readline())
+            delta_frames = [json.loads(await delta_reader.readline()) for _ in range(2)]
+
+            await spectators.stop()
+            for writer in (full_writer, decimated_writer, delta_writer):
+                writer.close()
+
+            return map_config, full_frames, decimated_frame, delta_frames
+
+        map_config, full_frames, decimated_frame, delta_frames = asyncio.run(run())
+
+        self.assertEqual(map_config, self.game.map_config)
+        self.assertEqual([frame['tick'] for frame in full_frames], [1, 2])
+        self.assertEqual(len(full_frames[0]['units']), 2)
+        self.assertEqual(decimated_frame['tick'], 2)
+        self.assertTrue(delta_frames[0]['key'])
+        self.assertEqual(delta_frames[1]['units'], [{'id': 0, 'x': 2, 'y': 0}])
+        self.assertEqual(delta_frames[1]['removed'], [])
+
+    def test_connect_before_players(self):
+        self.game = Game(10, 10, [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ], max_ticks=2)
+
+        async def run():
+            spectators = SpectatorServer(self.game, '127.0.0.1', 0)
+            # the runner listens while the players are still connecting
+            await start_spectators([spectators])
+            reader, writer, map_config = await self.connect(spectators)
+            server = spectators.server
+            # the game loop starts its observers again
+            await spectators.start()
+            same_server = spectators.server is server
+
+            game_loop = GameLoop(self.game, [IdleClient(), IdleClient()], observers=[spectators])
+            await game_loop.play()
+
+            frames = [json.loads(await reader.readline()) for _ in range(2)]
+            writer.close()
+            return map_config, same_server, frames
+
+        map_config, same_server, frames = asyncio.run(run())
+
+        self.assertEqual(map_config, self.game.map_config)
+        self.assertTrue(same_server)
+        self.assertEqual([frame['tick'] for frame in frames], [1, 2])
+
+    def test_slow_spectator_is_dropped(self):
+        async def run():
+            spectators = SpectatorServer(self.game, '127.0.0.1', 0, high_water_mark=-1, max_skipped=1)
+            await spectators.start()
+            reader, writer, _ = await self.connect(spectators)
+
+            self.tick(spectators, 1)
+            skipped = spectators.spectators[0].skipped
+            self.tick(spectators, 2)
+
+            await spectators.stop()
+            writer.close()
+            return skipped, spectators.dropped
+
+        skipped, dropped = asyncio.run(run())
+
+        self.assertEqual(skipped, 1)
+        self.assertEqual(dropped, 1)
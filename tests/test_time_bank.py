@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from clients import Client
+from game import Game
+from game_loop import GameLoop
+from time_bank import TimeBank
+
+
+class TimeBankTestCase(unittest.TestCase):
+    def test_in_time_response(self):
+        time_bank = TimeBank(1.0, 5.0)
+        time_bank.charge(0.5)
+
+        self.assertEqual(time_bank.reserve, 5.0)
+        self.assertEqual(time_bank.overruns, 0)
+        self.assertEqual(time_bank.available(), 6.0)
+
+    def test_overrun_draws_from_reserve(self):
+        time_bank = TimeBank(1.0, 5.0)
+        time_bank.charge(3.0)
+
+        self.assertEqual(time_bank.reserve, 3.0)
+        self.assertEqual(time_bank.overruns, 1)
+        self.assertFalse(time_bank.exhausted)
+
+    def test_exhausted_reserve(self):
+        time_bank = TimeBank(1.0, 1.0)
+        time_bank.charge(2.5)
+
+        self.assertEqual(time_bank.reserve, 0.0)
+        self.assertTrue(time_bank.exhausted)
+        self.assertEqual(time_bank.available(), 1.0)
+
+
+class SlowClient(Client):
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.disconnected = False
+
+    async def send_message(self, msg):
+        pass
+
+    async def get_command(self):
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        return []
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class GameLoopTimeBankTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        self.game = Game(10, 10, teams)
+
+    def test_overrun_does_not_disconnect(self):
+        client = SlowClient([0.05])
+        game_loop = GameLoop(self.game, [client, SlowClient([])], tick_timeout=0.01, time_bank=1.0)
+
+        command = asyncio.run(game_loop.get_command_wrapper(0))
+
+        self.assertEqual(command, [])
+        self.assertFalse(client.disconnected)
+        self.assertEqual(game_loop.time_banks[0].overruns, 1)
+
+    def test_exhausted_bank_disconnects(self):
+        client = SlowClient([0.5])
+        game_loop = GameLoop(self.game, [client, SlowClient([])], tick_timeout=0.01, time_bank=0.02)
+
+        command = asyncio.run(game_loop.get_command_wrapper(0))
+
+        self.assertIsNone(command)
+        self.assertTrue(client.disconnected)
+        self.assertTrue(game_loop.summary()['clients'][0]['exhausted'])
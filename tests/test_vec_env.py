@@ -0,0 +1,130 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    from vec_env import VecEnv, MOVE, FIRE
+
+
+MAP_CONFIG = {
+    'map_width': 10,
+    'map_height': 10,
+    'teams': [
+        [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+        [
+            {"id": 1, "spawn_x": 9, "spawn_y": 9, "position_x": 1, "position_y": 2},
+            {"id": 2, "spawn_x": 9, "spawn_y": 0}
+        ]
+    ]
+}
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class VecEnvTestCase(unittest.TestCase):
+    def test_reset_observation(self):
+        env = VecEnv(MAP_CONFIG, 3)
+        obs = env.reset()
+
+        self.assertEqual(obs.shape, (3, 4, 10, 10))
+        self.assertEqual(obs[0, 0, 0, 0], 1)
+        self.assertEqual(obs[0, 1, 2, 1], 1)
+        self.assertEqual(obs[0, 3, 9, 9], 1)
+        self.assertEqual(obs.sum(), 3 * 6)
+
+    def test_step(self):
+        env = VecEnv(MAP_CONFIG, 2, max_ticks=10)
+        env.reset()
+
+        actions = np.zeros((2, 3, 3), dtype=np.int64)
+        actions[0, 0] = (MOVE, 1, 1)
+        actions[1, 0] = (FIRE, 1, 2)
+        obs, rewards, dones, infos = env.step(actions)
+
+        self.assertEqual(obs[0, 0, 1, 1], 1)
+        self.assertEqual(obs[1, 1, 2, 1], 0)
+        self.assertEqual(rewards.tolist(), [[0, 0], [1, -1]])
+        self.assertFalse(dones.any())
+
+    def test_done_resets_game(self):
+        env = VecEnv(MAP_CONFIG, 1, max_ticks=1)
+        env.reset()
+
+        actions = np.zeros((1, 3, 3), dtype=np.int64)
+        actions[0, 0] = (MOVE, 1, 1)
+        obs, rewards, dones, infos = env.step(actions)
+
+        self.assertTrue(dones[0])
+        self.assertEqual(infos[0]['ticks'], 1)
+        self.assertEqual(infos[0]['end_reason'], 'tick_limit')
+        self.assertEqual(obs[0, 0, 0, 0], 1)
+
+    def test_workers(self):
+        with VecEnv(MAP_CONFIG, 3, num_workers=2) as env:
+            obs = env.reset()
+            actions = np.zeros((3, 3, 3), dtype=np.int64)
+            actions[:, 0] = (FIRE, 1, 2)
+            obs, rewards, dones, infos = env.step(actions)
+
+        self.assertEqual(obs.shape, (3, 4, 10, 10))
+        self.assertEqual(rewards[:, 0].tolist(), [1, 1, 1])
+        self.assertEqual(len(infos), 3)
+
+    def test_elimination_ends_game(self):
+        env = VecEnv(MAP_CONFIG, 1)
+        env.reset()
+
+        actions = np.zeros((1, 3, 3), dtype=np.int64)
+        actions[0, 1] = (MOVE, 0, 1)
+        obs, rewards, dones, infos = env.step(actions)
+
+        self.assertTrue(dones[0])
+        self.assertEqual(infos[0]['end_reason'], 'one_team_left')
+        self.assertEqual(infos[0]['winners'], [1])
+
+    def test_action_masks(self):
+        env = VecEnv(MAP_CONFIG, 2)
+        env.reset()
+
+        actions = np.zeros((2, 3, 3), dtype=np.int64)
+        actions[1, 0] = (FIRE, 1, 2)
+        env.step(actions)
+        move_masks, fire_masks = env.action_masks()
+
+        self.assertEqual(move_masks.shape, (2, 3, 9))
+        self.assertEqual(fire_masks.shape, (2, 3, 25))
+        # unit in the corner can stay or move right, down and diagonally
+        self.assertEqual(np.flatnonzero(move_masks[0, 0]).tolist(), [4, 5, 7, 8])
+        self.assertEqual(fire_masks[0, 1].sum(), 20)
+        # dead unit has no legal actions
+        self.assertFalse(move_masks[1, 1].any())
+        self.assertFalse(fire_masks[1, 1].any())
+
+    def test_observation_follows_games(self):
+        env = VecEnv(MAP_CONFIG, 8, max_ticks=20)
+        env.reset()
+        rng = np.random.default_rng(0)
+
+        for _ in range(30):
+            actions = np.zeros((8, 3, 3), dtype=np.int64)
+            actions[:, :, 0] = rng.integers(0, 3, (8, 3))
+            actions[:, :, 1:] = rng.integers(0, 10, (8, 3, 2))
+            obs, _, _, _ = env.step(actions)
+
+            expected = np.zeros_like(obs)
+            for env_id, game in enumerate(env.batch.games):
+                for unit in game.units.values():
+                    expected[env_id, unit.team, unit.position[1], unit.position[0]] = 1
+                    expected[env_id, 2 + unit.team, unit.spawn[1], unit.spawn[0]] = 1
+            np.testing.assert_array_equal(obs, expected)
+
+    def test_wrong_actions_shape(self):
+        env = VecEnv(MAP_CONFIG, 2)
+        with self.assertRaises(ValueError):
+            env.step(np.zeros((1, 2, 3)))
+
+    def test_too_many_workers(self):
+        with self.assertRaises(ValueError):
+            VecEnv(MAP_CONFIG, 2, num_workers=3)
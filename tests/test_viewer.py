@@ -0,0 +1,47 @@
+import io
+import unittest
+
+from game import Game
+from viewer import TerminalViewer
+
+
+class TerminalViewerTestCase(unittest.TestCase):
+    def setUp(self):
+        teams = [
+            [{"id": 0, "spawn_x": 0, "spawn_y": 0}],
+            [{"id": 1, "spawn_x": 9, "spawn_y": 9}]
+        ]
+        self.game = Game(10, 10, teams)
+        self.stream = io.StringIO()
+        self.viewer = TerminalViewer(self.game.map_config, stream=self.stream)
+
+    def test_first_frame_is_whole(self):
+        self.viewer.draw(self.game.get_state())
+
+        output = self.stream.getvalue()
+        self.assertTrue(output.startswith('\x1b[2J'))
+        self.assertEqual(output.count('\n'), 10)
+        self.assertIn('00', output)
+
+    def test_redraw_changed_cells(self):
+        self.viewer.draw(self.game.get_state())
+        self.stream.seek(0)
+        self.stream.truncate()
+
+        tick_log = {'units': [{'id': 0, 'x': 1, 'y': 1}, {'id': 1, 'x': 9, 'y': 9}], 'actions': []}
+        self.viewer.draw(tick_log)
+
+        # unit left its spawn and moved to a free cell, the other unit did not change
+        output = self.stream.getvalue()
+        self.assertEqual(output.count('\x1b['), 2)
+        self.assertIn('X0', output)
+        self.assertIn('00', output)
+        self.assertNotIn('11', output)
+
+    def test_rate_limited(self):
+        self.viewer.on_tick(self.game.get_state())
+        self.viewer.on_tick(self.game.get_state())
+
+        self.assertEqual(self.stream.getvalue(), '')
+        self.viewer.flush()
+        self.assertNotEqual(self.stream.getvalue(), '')
@@ -0,0 +1,53 @@
+TICK_TIMEOUT = 2.0
+TIME_BANK = 10.0
+
+
+class TimeBank:
+    """Per-client response time budget.
+
+    Every tick the client may think for ``tick_timeout`` seconds for free.
+    Anything above that is drawn from a cumulative ``reserve``; only when the
+    reserve is exhausted the client runs out of time.
+    """
+
+    __slots__ = ('tick_timeout', 'reserve', 'initial_reserve',
+                 'ticks', 'total_time', 'max_time', 'overruns', 'exhausted')
+
+    def __init__(self, tick_timeout=TICK_TIMEOUT, reserve=TIME_BANK):
+        self.tick_timeout = tick_timeout
+        self.reserve = reserve
+        self.initial_reserve = reserve
+
+        self.ticks = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.overruns = 0
+        self.exhausted = False
+
+    def available(self):
+        # maximal time the client can spend on the current tick
+        return self.tick_timeout + self.reserve
+
+    def charge(self, elapsed):
+        self.ticks += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+        overrun = elapsed - self.tick_timeout
+        if overrun > 0:
+            self.overruns += 1
+            self.reserve = max(0.0, self.reserve - overrun)
+            if self.reserve == 0.0:
+                self.exhausted = True
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'total_time': self.total_time,
+            'mean_time': self.total_time / self.ticks if self.ticks else 0.0,
+            'max_time': self.max_time,
+            'overruns': self.overruns,
+            'reserve_used': self.initial_reserve - self.reserve,
+            'reserve_left': self.reserve,
+            'exhausted': self.exhausted,
+        }
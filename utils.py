@@ -6,4 +6,13 @@ def is_coordinate(coord):
 
 
 def inside_rectangle(width, height, x, y):
-    return 0 <= x < width and 0 <= y < height
\ No newline at end of file
+    return 0 <= x < width and 0 <= y < height
+
+
+def percentiles(values, points=(50, 90, 99)):
+    # nearest-rank percentiles of the values
+    values = sorted(values)
+    if not values:
+        return {point: None for point in points}
+
+    return {point: values[min(len(values) - 1, max(0, -(-point * len(values) // 100) - 1))] for point in points}
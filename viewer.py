@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from game import Game
+from observers import Observer
+
+
+FPS = 10
+
+EMPTY_CELL = '-'
+
+
+class TerminalViewer(Observer):
+    """Rate limited terminal view of the game.
+
+    Tick logs are only stored by ``on_tick``, drawing happens in a separate task
+    at most ``fps`` times per second and rewrites only the cells that changed
+    since the previous frame.
+    """
+
+    def __init__(self, map_config, fps=FPS, stream=None):
+        self.width = map_config['map_width']
+        self.height = map_config['map_height']
+        self.units = {unit['id']: unit for unit in map_config['units']}
+        self.interval = 1 / fps
+        self.stream = stream if stream is not None else sys.stdout
+
+        labels = [str(unit['team']) + str(unit_id) for unit_id, unit in self.units.items()]
+        self.cell_width = max(map(len, labels), default=1) + 2
+
+        self.pending = None
+        self.cells = None
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def on_tick(self, tick_log):
+        self.pending = tick_log
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        self.flush()
+        self.stream.write(self.goto(self.height, 0) + '\n')
+        self.stream.flush()
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        if self.pending is not None:
+            self.draw(self.pending)
+            self.pending = None
+
+    def render_cells(self, tick_log):
+        cells = {}
+        for unit in tick_log['units']:
+            config = self.units[unit['id']]
+            # unit standing on its spawn hides it
+            cells.setdefault((config['spawn_x'], config['spawn_y']), 'X' + str(unit['id']))
+            cells[unit['x'], unit['y']] = str(config['team']) + str(unit['id'])
+
+        return cells
+
+    def draw(self, tick_log):
+        cells = self.render_cells(tick_log)
+
+        if self.cells is None:
+            # first frame is drawn whole
+            output = ['\x1b[2J', self.goto(0, 0)]
+            for y in range(self.height):
+                row = (cells.get((x, y), EMPTY_CELL).ljust(self.cell_width) for x in range(self.width))
+                output.append(''.join(row) + '\n')
+        else:
+            output = []
+            for cell in self.cells.keys() - cells.keys():
+                output.append(self.goto_cell(*cell) + EMPTY_CELL.ljust(self.cell_width))
+            for cell, label in cells.items():
+                if self.cells.get(cell) != label:
+                    output.append(self.goto_cell(*cell) + label.ljust(self.cell_width))
+
+        self.cells = cells
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+
+    def goto_cell(self, x, y):
+        return self.goto(y, x * self.cell_width)
+
+    @staticmethod
+    def goto(row, column):
+        return f'\x1b[{row + 1};{column + 1}H'
+
+
+async def replay(log, viewer):
+    await viewer.start()
+    for tick_log in log:
+        viewer.on_tick(tick_log)
+        await asyncio.sleep(viewer.interval)
+    await viewer.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay saved game log in the terminal')
+    parser.add_argument('log', type=argparse.FileType(mode='r'), help='Path to the game log')
+    parser.add_argument('--map', type=argparse.FileType(mode='r'), help='Path to the map file', required=True)
+    parser.add_argument('--fps', type=float, default=FPS)
+
+    args = parser.parse_args()
+    viewer = TerminalViewer(Game.from_map_config(json.load(args.map)).map_config, args.fps)
+    asyncio.run(replay(json.load(args.log), viewer))